@@ -0,0 +1,168 @@
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from recipes.events import record_event
+from recipes.models import Ingredient, Recipe, RecipeEvent, Subscription
+from .filters import IngredientFilter, RecipeFilter
+from .pagination import PageNumberLimitPagination
+from .renderers import FastJSONRenderer, acached_fragment
+from .fast_serializers import FastRecipeSerializer
+from .serializers import IngredientSerializer
+from .sparse import parse_sparse_fields
+from .throttling import throttle
+from .utils import get_ingredients_json, recipe_json_key
+from .views import IngredientViewSet, RecipeViewSet
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    response = HttpResponse(
+        FastJSONRenderer().render(data),
+        status=status_code, content_type='application/json'
+    )
+    # Как у Response DRF: по data CompressionMiddleware находит
+    # заранее сжатые фрагменты.
+    response.data = data
+    return response
+
+
+def read_path(handler, fallback):
+    """Отдаёт GET асинхронному обработчику, остальное — вьюсету DRF."""
+    read_from_replica = fallback.cls.read_from_replica
+    fallback = sync_to_async(fallback)
+
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await fallback(request, *args, **kwargs)
+        request = Request(request, authenticators=[
+            authenticator() for authenticator in
+            api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        try:
+            # Аутентификация DRF ходит в БД, поэтому выполняется в потоке.
+            await sync_to_async(lambda: request.user)()
+            return render(await handler(request, *args, **kwargs))
+        except Http404 as exc:
+            return render(
+                {'detail': NotFound(*exc.args).detail},
+                status.HTTP_404_NOT_FOUND
+            )
+        except APIException as exc:
+            response = render(
+                exc.detail if isinstance(exc.detail, (list, dict))
+                else {'detail': exc.detail},
+                exc.status_code
+            )
+            if getattr(exc, 'wait', None):
+                response['Retry-After'] = str(math.ceil(exc.wait))
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = (
+                    request.authenticators[0].authenticate_header(request))
+            return response
+
+    view.read_from_replica = read_from_replica
+    return csrf_exempt(view)
+
+
+async def filter_queryset(filterset):
+    """Фильтры с выбором из БД (теги) валидируются синхронно."""
+    return await sync_to_async(lambda: filterset.qs)()
+
+
+def get_sparse_fields(request):
+    return parse_sparse_fields(
+        request.query_params, FastRecipeSerializer.field_names,
+        FastRecipeSerializer.relations
+    )
+
+
+async def mark_subscriptions(recipes, user, fields, expand):
+    """Проставляет is_subscribed авторам одним запросом на страницу."""
+    if fields is not None and 'is_subscribed' not in expand.get(
+        'author', ()
+    ):
+        return
+    subscribed = set()
+    if user.is_authenticated:
+        subscribed = {
+            author_id async for author_id in Subscription.objects.filter(
+                user=user, author__in={recipe.author_id for recipe in recipes}
+            ).values_list('author_id', flat=True)
+        }
+    for recipe in recipes:
+        recipe.author.is_subscribed = recipe.author_id in subscribed
+
+
+async def recipe_list(request):
+    fields, expand = get_sparse_fields(request)
+    recipes = await filter_queryset(RecipeFilter(
+        request.query_params, queryset=RecipeViewSet.read_queryset(
+            request.user, request.query_params, fields, expand),
+        request=request
+    ))
+    paginator = PageNumberLimitPagination()
+    page = await paginator.apaginate_queryset(recipes, request)
+    await mark_subscriptions(page, request.user, fields, expand)
+    return paginator.get_paginated_response(FastRecipeSerializer(
+        page, many=True, context={'request': request},
+        fields=fields, expand=expand
+    ).data).data
+
+
+async def recipe_detail(request, pk):
+    async def build():
+        fields, expand = get_sparse_fields(request)
+        try:
+            recipe = await RecipeViewSet.read_queryset(
+                request.user, request.query_params, fields, expand
+            ).aget(pk=pk)
+        except Recipe.DoesNotExist:
+            raise Http404('No Recipe matches the given query.')
+        await mark_subscriptions([recipe], request.user, fields, expand)
+        return FastRecipeSerializer(
+            recipe, context={'request': request}, fields=fields,
+            expand=expand
+        ).data
+
+    if request.user.is_authenticated:
+        data = await build()
+    else:
+        data = await acached_fragment(
+            await sync_to_async(recipe_json_key)(request, pk), build,
+            settings.RECIPE_CACHE_TTL
+        )
+    await sync_to_async(record_event)(RecipeEvent.VIEW, pk, request.user)
+    return data
+
+
+async def ingredient_list(request):
+    if not (
+        request.query_params.get('name') or request.query_params.get('search')
+    ):
+        return await sync_to_async(get_ingredients_json)()
+    await sync_to_async(throttle)(request, 'ingredient_search')
+    ingredients = await filter_queryset(IngredientFilter(
+        request.query_params, queryset=SearchFilter().filter_queryset(
+            request, Ingredient.objects.all(), IngredientViewSet)
+    ))
+    return IngredientSerializer(
+        [ingredient async for ingredient in ingredients], many=True
+    ).data
+
+
+recipes = read_path(recipe_list, RecipeViewSet.as_view(
+    {'get': 'list', 'post': 'create'}))
+recipe = read_path(recipe_detail, RecipeViewSet.as_view({
+    'get': 'retrieve', 'put': 'update',
+    'patch': 'partial_update', 'delete': 'destroy'
+}))
+ingredients = read_path(ingredient_list, IngredientViewSet.as_view(
+    {'get': 'list'}))
@@ -0,0 +1,47 @@
+import copy
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from .caches import LocalLRUCache
+
+# Версия токенов пользователя в общем кэше: меняется при отзыве токена
+# и изменении пользователя в любом воркере.
+USER_VERSION_KEY = 'api:token-user-version:{}'
+
+token_cache = LocalLRUCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL,
+    name='tokens'
+)
+
+
+def user_version(user_id):
+    return cache.get(USER_VERSION_KEY.format(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием пары токен-пользователь.
+
+    Пара лежит в памяти процесса вместе с версией пользователя из общего
+    кэша. Попадание стоит одного чтения кэша вместо запроса к БД; если
+    другой воркер сменил версию, пара перечитывается из БД. Без
+    REDIS_URL версия видна только своему процессу, и отозванный токен в
+    остальных воркерах работает до TOKEN_CACHE_TTL секунд.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            user, token, version = cached
+            if user_version(user.pk) == version:
+                return copy.copy(user), token
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, (user, token, user_version(user.pk)))
+        return user, token
+
+
+def invalidate_user_tokens(user_id):
+    cache.set(USER_VERSION_KEY.format(user_id), uuid.uuid4().hex, None)
+    token_cache.delete_where(lambda cached: cached[0].pk == user_id)
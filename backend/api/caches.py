@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from .metrics import CACHE_REQUESTS
+
+
+class LocalLRUCache:
+    """Потокобезопасный LRU-кэш в памяти процесса с ограниченным TTL."""
+
+    def __init__(self, maxsize, ttl, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+        # Именованные кэши попадают в метрики foodgram_cache_requests_total.
+        self._counters = {
+            result: CACHE_REQUESTS.labels(name, result)
+            for result in ('hit', 'miss')
+        } if name else None
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                self._data.pop(key, None)
+                self.misses += 1
+                hit = False
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                hit = True
+        if self._counters:
+            self._counters['hit' if hit else 'miss'].inc()
+        return item[0] if hit else default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [
+                key for key, (value, _) in self._data.items()
+                if predicate(value)
+            ]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
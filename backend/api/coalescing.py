@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Пауза между проверками кэша, пока значение считает другой воркер.
+LOCK_POLL_INTERVAL = 0.05
+
+# Ключ -> Future вычисления, которое сейчас идёт в этом процессе.
+flights = {}
+flights_lock = threading.Lock()
+
+
+def join_flight(key):
+    """(future, ведущий ли): первый запрос ключа становится ведущим."""
+    with flights_lock:
+        future = flights.get(key)
+        if future is not None:
+            return future, False
+        future = flights[key] = Future()
+        return future, True
+
+
+def land_flight(key, future, result=None, exception=None):
+    with flights_lock:
+        del flights[key]
+    if exception is None:
+        future.set_result(result)
+    else:
+        future.set_exception(exception)
+
+
+def single_flight(key, build):
+    """Результат build(), один на все одновременные вызовы с key.
+
+    Пока ведущий вызов считает, остальные потоки процесса ждут его
+    результат или исключение вместо того, чтобы повторять работу.
+    """
+    future, leader = join_flight(key)
+    if not leader:
+        return future.result()
+    try:
+        result = build()
+    except BaseException as exc:
+        land_flight(key, future, exception=exc)
+        raise
+    land_flight(key, future, result)
+    return result
+
+
+async def asingle_flight(key, abuild):
+    """Асинхронный вариант single_flight, abuild — корутинная функция."""
+    future, leader = join_flight(key)
+    if not leader:
+        return await asyncio.wrap_future(future)
+    try:
+        result = await abuild()
+    except BaseException as exc:
+        land_flight(key, future, exception=exc)
+        raise
+    land_flight(key, future, result)
+    return result
+
+
+def fill(key, build, timeout):
+    """Считает значение key под блокировкой в общем кэше.
+
+    Блокировку берёт один воркер, остальные ждут, пока значение
+    появится в кэше. Блокировка живёт CACHE_LOCK_TIMEOUT секунд: если
+    владелец упал, её следующим возьмёт один из ждущих.
+    """
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    while not cache.add(lock_key, token, settings.CACHE_LOCK_TIMEOUT):
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    try:
+        # Прежний владелец мог записать значение до нашей блокировки.
+        value = cache.get(key)
+        if value is None:
+            value = build()
+            if value is not None:
+                cache.set(key, value, timeout)
+        return value
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+async def afill(key, abuild, timeout):
+    """Асинхронный вариант fill."""
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    while not await cache.aadd(
+        lock_key, token, settings.CACHE_LOCK_TIMEOUT
+    ):
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+    try:
+        value = await cache.aget(key)
+        if value is None:
+            value = await abuild()
+            if value is not None:
+                await cache.aset(key, value, timeout)
+        return value
+    finally:
+        if await cache.aget(lock_key) == token:
+            await cache.adelete(lock_key)
+
+
+def get_or_build(key, build, timeout):
+    """Значение key из кэша или результат build(), сохранённый на timeout.
+
+    Промах считается один раз: в процессе одновременные запросы ждут
+    одно вычисление, между воркерами его выполняет взявший блокировку
+    в кэше. Так истечение популярной записи не запускает одинаковые
+    запросы к БД во всех воркерах разом. None не кэшируется.
+    """
+    value = cache.get(key)
+    if value is None:
+        value = single_flight(key, lambda: fill(key, build, timeout))
+    return value
+
+
+async def aget_or_build(key, abuild, timeout):
+    """Асинхронный вариант get_or_build, abuild — корутинная функция."""
+    value = await cache.aget(key)
+    if value is None:
+        value = await asingle_flight(
+            key, lambda: afill(key, abuild, timeout))
+    return value
@@ -0,0 +1,51 @@
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Порядок предпочтения при равном весе в Accept-Encoding.
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding):
+    """Лучшее из поддерживаемых сжатий, которое принимает клиент."""
+    weights = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip()] = weight
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(content, encoding, precompressed=False):
+    """Сжатие на лету быстрое, заранее подготовленное — максимальное."""
+    if encoding == 'br':
+        return brotli.compress(content, quality=11 if precompressed else 5)
+    return gzip.compress(
+        content, compresslevel=9 if precompressed else 6, mtime=0)
+
+
+def precompress(content):
+    """Сжатые варианты содержимого для всех поддерживаемых кодировок."""
+    if len(content) < settings.COMPRESSION_MIN_SIZE:
+        return {}
+    return {
+        encoding: compress(content, encoding, precompressed=True)
+        for encoding in ENCODINGS
+    }
@@ -0,0 +1,28 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+# Включается middleware на время безопасного запроса к вьюсету,
+# который разрешает чтение с реплик.
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+class ReplicaRouter:
+    """Чтение данных рецептов с реплик, всё остальное — с основной БД."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            replica_reads.get()
+            and settings.DATABASE_REPLICAS
+            and model._meta.app_label == 'recipes'
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,280 @@
+from operator import attrgetter
+
+from django.db.models import Prefetch
+from django.utils.functional import cached_property
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from recipes.models import (
+    FavoriteRecipe, Product, ShoppingRecipe, Subscription, Tag
+)
+from .serializers import MemberSerializer, RecipeSerializer
+
+
+class FastRecipeSerializer:
+    """Сериализация рецептов для чтения без механики полей DRF.
+
+    Отдает те же данные, что RecipeSerializer, но собирает словари
+    напрямую из рецептов с предзагруженными tags, products__ingredient
+    и author. Флаги, которых нет в аннотациях, вычисляются одним
+    запросом на страницу, а не на каждый рецепт.
+
+    fields и expand — результат parse_sparse_fields: для них
+    prepare_queryset загружает только нужные колонки и связи.
+    """
+
+    field_names = RecipeSerializer.Meta.fields
+    relations = {
+        'tags': ('id', 'name', 'slug'),
+        'author': MemberSerializer.Meta.fields,
+        'ingredients': ('id', 'name', 'measurement_unit', 'amount'),
+    }
+    author_fields = tuple(
+        name for name in MemberSerializer.Meta.fields
+        if name not in ('is_subscribed', 'avatar')
+    )
+    get_author_fields = attrgetter(*author_fields)
+    get_tag = attrgetter('id', 'name', 'slug')
+    get_product = attrgetter(
+        'ingredient_id', 'ingredient.name', 'ingredient.measurement_unit',
+        'amount'
+    )
+    product_attributes = {
+        'id': 'ingredient_id', 'name': 'ingredient.name',
+        'measurement_unit': 'ingredient.measurement_unit', 'amount': 'amount'
+    }
+
+    def __init__(self, instance=None, many=False, context=None, fields=None,
+                 expand=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.fields = fields
+        self.expand = expand or {}
+        if fields is not None:
+            self.representers = [
+                (name, self.get_representer(name)) for name in fields
+            ]
+
+    @classmethod
+    def prepare_queryset(cls, recipes, fields, expand):
+        """Оставляет в выборке только колонки и связи выбранных полей."""
+        recipes = recipes.prefetch_related(None)
+        only = ['id', *(
+            name for name in ('name', 'image', 'text', 'cooking_time')
+            if name in fields
+        )]
+        if 'author' in expand:
+            recipes = recipes.select_related('author')
+            only += ['author', *(
+                f'author__{name}' for name in expand['author']
+                if name != 'is_subscribed'
+            )]
+        elif 'author' in fields:
+            only.append('author')
+            recipes = recipes.select_related(None)
+        else:
+            recipes = recipes.select_related(None)
+        if 'tags' in fields:
+            recipes = recipes.prefetch_related(Prefetch(
+                'tags', queryset=Tag.objects.only(
+                    'id', *expand.get('tags', ()))
+            ))
+        if 'ingredients' in expand:
+            recipes = recipes.prefetch_related(Prefetch(
+                'products',
+                queryset=Product.objects.select_related('ingredient').only(
+                    'recipe', 'ingredient', 'amount', *(
+                        f'ingredient__{name}'
+                        for name in expand['ingredients']
+                        if name in ('name', 'measurement_unit')
+                    )
+                )
+            ))
+        elif 'ingredients' in fields:
+            recipes = recipes.prefetch_related(Prefetch(
+                'products',
+                queryset=Product.objects.only('recipe', 'ingredient')
+            ))
+        return recipes.only(*only)
+
+    @cached_property
+    def data(self):
+        if self.many:
+            recipes = list(self.instance)
+            self.load_flags(recipes)
+            return ReturnList(
+                [self.to_representation(recipe) for recipe in recipes],
+                serializer=self
+            )
+        self.load_flags([self.instance])
+        return ReturnDict(self.to_representation(self.instance),
+                          serializer=self)
+
+    @cached_property
+    def request(self):
+        return self.context.get('request')
+
+    @cached_property
+    def user(self):
+        return self.request.user if self.request else None
+
+    def needs(self, field, relation=None):
+        if self.fields is None:
+            return True
+        if relation is None:
+            return field in self.fields
+        return field in self.expand.get(relation, ())
+
+    def load_flags(self, recipes):
+        """Флаги пользователя для рецептов без соответствующих аннотаций."""
+        self.subscribed = self.favorited = self.in_cart = None
+        if self.user is None or not self.user.is_authenticated:
+            return
+        if self.needs('is_subscribed', 'author') and not all(
+            hasattr(recipe.author, 'is_subscribed') for recipe in recipes
+        ):
+            self.subscribed = set(Subscription.objects.filter(
+                user=self.user,
+                author__in={recipe.author_id for recipe in recipes}
+            ).values_list('author_id', flat=True))
+        if self.needs('is_favorited') and not all(
+            hasattr(recipe, 'is_favorited') for recipe in recipes
+        ):
+            self.favorited = self.user_recipe_ids(FavoriteRecipe, recipes)
+        if self.needs('is_in_shopping_cart') and not all(
+            hasattr(recipe, 'is_in_shopping_cart') for recipe in recipes
+        ):
+            self.in_cart = self.user_recipe_ids(ShoppingRecipe, recipes)
+
+    def user_recipe_ids(self, model, recipes):
+        return set(model.objects.filter(
+            user=self.user, recipe__in=recipes
+        ).values_list('recipe_id', flat=True))
+
+    def user_flag(self, recipe, attribute, loaded, object_id):
+        if hasattr(recipe, attribute):
+            return getattr(recipe, attribute)
+        if self.user is None:
+            return None
+        return bool(loaded) and object_id in loaded
+
+    def file_url(self, file):
+        if not file:
+            return None
+        if self.request is None:
+            return file.url
+        return self.request.build_absolute_uri(file.url)
+
+    def is_subscribed(self, author):
+        if hasattr(author, 'is_subscribed'):
+            return author.is_subscribed
+        if self.user is None:
+            return None
+        return (
+            self.user.is_authenticated and author.pk != self.user.pk
+            and author.pk in self.subscribed
+        )
+
+    def represent_author(self, author):
+        data = dict(zip(self.author_fields, self.get_author_fields(author)))
+        data['is_subscribed'] = self.is_subscribed(author)
+        data['avatar'] = self.file_url(author.avatar)
+        return data
+
+    def to_representation(self, recipe):
+        if self.fields is not None:
+            return {
+                name: represent(recipe)
+                for name, represent in self.representers
+            }
+        return {
+            'id': recipe.id,
+            'tags': [
+                dict(zip(('id', 'name', 'slug'), self.get_tag(tag)))
+                for tag in recipe.tags.all()
+            ],
+            'author': self.represent_author(recipe.author),
+            'ingredients': [
+                dict(zip(
+                    ('id', 'name', 'measurement_unit', 'amount'),
+                    self.get_product(product)
+                ))
+                for product in recipe.products.all()
+            ],
+            'is_favorited': self.user_flag(
+                recipe, 'is_favorited', self.favorited, recipe.pk),
+            'is_in_shopping_cart': self.user_flag(
+                recipe, 'is_in_shopping_cart', self.in_cart, recipe.pk),
+            'name': recipe.name,
+            'image': self.file_url(recipe.image),
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+
+    def get_representer(self, name):
+        """Функция одного поля разреженного ответа."""
+        subfields = self.expand.get(name)
+        if name == 'tags':
+            if subfields is None:
+                return lambda recipe: [tag.pk for tag in recipe.tags.all()]
+            get_tag = attrgetter(*subfields)
+            return lambda recipe: [
+                pick(subfields, get_tag(tag)) for tag in recipe.tags.all()
+            ]
+        if name == 'ingredients':
+            if subfields is None:
+                return lambda recipe: [
+                    product.ingredient_id
+                    for product in recipe.products.all()
+                ]
+            get_product = attrgetter(*(
+                self.product_attributes[field] for field in subfields
+            ))
+            return lambda recipe: [
+                pick(subfields, get_product(product))
+                for product in recipe.products.all()
+            ]
+        if name == 'author':
+            if subfields is None:
+                return attrgetter('author_id')
+            represent = {
+                'is_subscribed': self.is_subscribed,
+                'avatar': lambda author: self.file_url(author.avatar),
+            }
+            getters = [
+                (field, represent.get(field, attrgetter(field)))
+                for field in subfields
+            ]
+            return lambda recipe: {
+                field: get(recipe.author) for field, get in getters
+            }
+        if name == 'image':
+            return lambda recipe: self.file_url(recipe.image)
+        if name == 'is_favorited':
+            return lambda recipe: self.user_flag(
+                recipe, 'is_favorited', self.favorited, recipe.pk)
+        if name == 'is_in_shopping_cart':
+            return lambda recipe: self.user_flag(
+                recipe, 'is_in_shopping_cart', self.in_cart, recipe.pk)
+        if name == 'coverage':
+            return lambda recipe: float(recipe.coverage)
+        return attrgetter(name)
+
+
+def pick(names, values):
+    """Словарь из полей, полученных attrgetter одного или нескольких."""
+    if len(names) == 1:
+        return {names[0]: values}
+    return dict(zip(names, values))
+
+
+class FastCookableRecipeSerializer(FastRecipeSerializer):
+    """Быстрая версия CookableRecipeSerializer."""
+
+    field_names = (*FastRecipeSerializer.field_names, 'coverage')
+
+    def to_representation(self, recipe):
+        data = super().to_representation(recipe)
+        if self.fields is None:
+            data['coverage'] = float(recipe.coverage)
+        return data
@@ -1,6 +1,7 @@
 from django_filters import rest_framework as filters
 
 from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
 
 
 class OneZeroFilter(filters.BooleanFilter):
@@ -17,10 +18,29 @@ class RecipeFilter(filters.FilterSet):
     tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
     is_favorited = OneZeroFilter(field_name='is_favorited')
     is_in_shopping_cart = OneZeroFilter(field_name='is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'Популярные'), ('trending', 'В трендах')),
+        method='order_recipes'
+    )
+
+    ORDERINGS = {
+        'popular': ('-popularity', '-pub_date'),
+        'trending': ('-trending', '-pub_date'),
+    }
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'is_favorited', 'is_in_shopping_cart', 'search',
+            'ordering'
+        )
+
+    def filter_search(self, recipes, name, value):
+        return search_recipes(recipes, value)
+
+    def order_recipes(self, recipes, name, value):
+        return recipes.order_by(*self.ORDERINGS[value])
 
 
 class IngredientFilter(filters.FilterSet):
@@ -0,0 +1,56 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+    Histogram, generate_latest
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+
+# Под gunicorn значения пишутся в общий каталог PROMETHEUS_MULTIPROC_DIR
+# и складываются по всем воркерам при чтении /metrics.
+REQUEST_LATENCY = Histogram(
+    'foodgram_request_duration_seconds', 'Время ответа на запрос',
+    ('method', 'route', 'view')
+)
+REQUEST_DB_QUERIES = Histogram(
+    'foodgram_request_db_queries', 'Число запросов к БД за запрос',
+    ('view',), buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, float('inf'))
+)
+REQUEST_DB_TIME = Histogram(
+    'foodgram_request_db_duration_seconds', 'Время запросов к БД за запрос',
+    ('view',)
+)
+RESPONSES = Counter(
+    'foodgram_responses_total', 'Ответы по кодам статуса', ('status',)
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'foodgram_requests_in_progress', 'Запросы в обработке',
+    multiprocess_mode='livesum'
+)
+WORKERS = Gauge(
+    'foodgram_workers', 'Живые процессы приложения',
+    multiprocess_mode='livesum'
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total', 'Обращения к кэшам в памяти',
+    ('cache', 'result')
+)
+RECIPES_CREATED = Counter(
+    'foodgram_recipes_created_total', 'Созданные рецепты'
+)
+SHOPPING_LIST_DOWNLOADS = Counter(
+    'foodgram_shopping_list_downloads_total', 'Скачивания списка покупок'
+)
+
+WORKERS.set(1)
+
+
+def render_metrics():
+    """Текст метрик в формате Prometheus и его Content-Type."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
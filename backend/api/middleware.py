@@ -0,0 +1,203 @@
+import hashlib
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+from .compression import choose_encoding, compress
+from .db_routers import replica_reads
+from .metrics import (
+    REQUEST_DB_QUERIES, REQUEST_DB_TIME, REQUEST_LATENCY, REQUESTS_IN_PROGRESS,
+    RESPONSES
+)
+from .profiling import (
+    RequestProfile, current_profile, get_view_label, profiles
+)
+from .renderers import JSONFragment
+
+
+def get_client_key(request):
+    client = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return 'primary-pin:' + hashlib.sha256(client.encode()).hexdigest()
+
+
+def reads_from_replica(view_func):
+    initkwargs = getattr(view_func, 'initkwargs', {})
+    return initkwargs.get('read_from_replica', getattr(
+        getattr(view_func, 'cls', view_func), 'read_from_replica', False))
+
+
+class ReplicaRoutingMiddleware:
+    """Направляет безопасные запросы на реплики.
+
+    После успешной записи клиент на READ_YOUR_WRITES_SECONDS закрепляется
+    за основной БД, чтобы сразу видеть свои изменения. Закрепление лежит
+    в кэше и должно быть видно всем воркерам, поэтому с репликами нужен
+    общий кэш (REDIS_URL).
+    """
+
+    def __init__(self, get_response):
+        if settings.DATABASE_REPLICAS and isinstance(
+            caches['default'], LocMemCache
+        ):
+            raise ImproperlyConfigured(
+                'DB_REPLICAS требует общего кэша: без REDIS_URL следующий '
+                'запрос клиента в другом воркере прочитает реплику и не '
+                'увидит его запись.'
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.set(False)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            cache.set(
+                get_client_key(request), True,
+                settings.READ_YOUR_WRITES_SECONDS
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and reads_from_replica(view_func)
+            and not cache.get(get_client_key(request))
+        ):
+            replica_reads.set(True)
+
+
+class ProfilingMiddleware:
+    """Замеряет SQL и время ответа для доли запросов.
+
+    Выборка PROFILING_SAMPLE_RATE попадает в кольцевой буфер процесса,
+    медленные запросы пишутся в журнал api.slow_queries у всех запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        if not (
+            sampled or settings.PROFILING_SLOW_QUERY_MS
+            or settings.METRICS_ENABLED
+        ):
+            return self.get_response(request)
+        profile = RequestProfile(request.method, request.path, sampled)
+        request.profile = profile
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        if sampled:
+            profile.duration_ms = (time.perf_counter() - start) * 1000
+            profile.status_code = response.status_code
+            profiles.record(profile)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, 'profile', None)
+        if profile is not None:
+            profile.view = get_view_label(view_func, request)
+
+
+class MetricsMiddleware:
+    """Собирает метрики запросов для /metrics.
+
+    Число и время запросов к БД берет из замеров ProfilingMiddleware,
+    поэтому должен стоять раньше него.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        request.metrics_view = ''
+        start = time.perf_counter()
+        with REQUESTS_IN_PROGRESS.track_inprogress():
+            response = self.get_response(request)
+        match = request.resolver_match
+        route = match.route if match else ''
+        view = request.metrics_view
+        REQUEST_LATENCY.labels(request.method, route, view).observe(
+            time.perf_counter() - start)
+        RESPONSES.labels(response.status_code).inc()
+        profile = getattr(request, 'profile', None)
+        if profile is not None:
+            REQUEST_DB_QUERIES.labels(view).observe(profile.sql_count)
+            REQUEST_DB_TIME.labels(view).observe(profile.sql_ms / 1000)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = get_view_label(view_func, request)
+
+
+class CompressionMiddleware:
+    """Сжимает ответы API brotli или gzip по Accept-Encoding клиента.
+
+    Сжимаются только ответы под /api/: админка с CSRF-токенами и
+    файлы остаются как есть. Ответы меньше COMPRESSION_MIN_SIZE байт
+    не сжимаются. Если ответ целиком состоит из JSONFragment с готовыми
+    сжатыми вариантами, отдается готовый вариант.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            not request.path.startswith('/api/')
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        data = getattr(response, 'data', None)
+        if (
+            isinstance(data, JSONFragment)
+            and encoding in data.encodings
+            and response.content == data.content
+        ):
+            content = data.encodings[encoding]
+        else:
+            content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response.headers['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
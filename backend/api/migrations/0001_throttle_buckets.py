@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Ключ')),
+                ('tokens', models.FloatField(verbose_name='Токены')),
+                ('updated', models.FloatField(db_index=True, verbose_name='Обновлена')),
+            ],
+            options={
+                'verbose_name': 'корзина токенов',
+                'verbose_name_plural': 'Корзины токенов',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class ThrottleBucket(models.Model):
+    """Корзина токенов ограничителя частоты запросов.
+
+    Общая для всех воркеров: состояние хранится в основной БД и меняется
+    одним условным UPDATE, см. api.throttling.
+    """
+
+    key = models.CharField('Ключ', max_length=255, unique=True)
+    tokens = models.FloatField('Токены')
+    # Время последнего пополнения, секунды Unix.
+    updated = models.FloatField('Обновлена', db_index=True)
+
+    class Meta:
+        verbose_name = 'корзина токенов'
+        verbose_name_plural = 'Корзины токенов'
+
+    def __str__(self):
+        return self.key
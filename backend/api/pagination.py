@@ -1,5 +1,80 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class PageNumberLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+    async def apaginate_queryset(self, queryset, request):
+        """Асинхронный аналог paginate_queryset для ASGI-представлений."""
+        self.request = request
+        paginator = self.django_paginator_class(
+            queryset, self.get_page_size(request))
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+        return [obj async for obj in self.page.object_list]
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по позиции (дата, id) последнего элемента страницы."""
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def get_page_size(self, request):
+        try:
+            return max(
+                1, int(request.query_params[self.page_size_query_param]))
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(pub_date), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        pub_date, pk = position
+        return urlsafe_b64encode(
+            f'{pub_date.isoformat()}|{pk}'.encode()).decode()
+
+    def paginate_positions(self, read_page, request):
+        """read_page(cursor, limit) возвращает позиции по убыванию."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        positions = read_page(self.decode_cursor(request), page_size)
+        self.last_position = (
+            positions[-1] if len(positions) == page_size else None)
+        return [pk for _, pk in positions]
+
+    def get_next_link(self):
+        if self.last_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.last_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
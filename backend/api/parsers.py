@@ -0,0 +1,75 @@
+import json
+import mimetypes
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import (
+    DataAndFiles, FileUploadParser, JSONParser, MultiPartParser
+)
+
+from .renderers import FastJSONRenderer, orjson
+
+
+def loads(content):
+    return json.loads(content) if orjson is None else orjson.loads(content)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson, без него работает как обычный JSONParser."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """multipart/form-data, где поля можно передать JSON-частью data.
+
+    Файлы Django пишет обработчиками загрузки по частям: небольшие в
+    память, крупнее FILE_UPLOAD_MAX_MEMORY_SIZE во временный файл.
+    Вложенные поля (ingredients, tags) передаются в части data тем же
+    JSON, что и в обычном запросе, файлы — соседними частями.
+    Без части data работает как обычный MultiPartParser.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        result = super().parse(stream, media_type, parser_context)
+        if 'data' not in result.data:
+            return result
+        try:
+            data = loads(result.data['data'])
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error in "data" - {exc}')
+        if not isinstance(data, dict):
+            raise ParseError('Часть "data" должна быть JSON-объектом')
+        # Request.data дополняется файлами через dict.update, а из
+        # MultiValueDict так попали бы списки.
+        return DataAndFiles(data, result.files.dict())
+
+
+class ImageUploadParser(FileUploadParser):
+    """Картинка телом запроса: Content-Type image/png, image/jpeg и т.д.
+
+    Тело читается по частям обработчиками загрузки Django. Файл
+    попадает в поле upload_field вью, имя файла необязательно.
+    """
+
+    media_type = 'image/*'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        result = super().parse(stream, media_type, parser_context)
+        field = getattr(parser_context['view'], 'upload_field', 'file')
+        return DataAndFiles({}, {field: result.files['file']})
+
+    def get_filename(self, stream, media_type, parser_context):
+        return super().get_filename(
+            stream, media_type, parser_context
+        ) or 'upload' + (mimetypes.guess_extension(media_type) or '')
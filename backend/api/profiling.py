@@ -0,0 +1,167 @@
+import logging
+import re
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+
+
+logger = logging.getLogger('api.slow_queries')
+
+current_profile = ContextVar('current_profile', default=None)
+
+IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Приводит запросы, отличающиеся только параметрами, к одному виду."""
+    sql = STRINGS.sub('%s', sql)
+    sql = NUMBERS.sub('%s', sql)
+    sql = IN_LIST.sub('(...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def get_view_label(view_func, request):
+    """Имя вьюсета и действия, например RecipeViewSet.favorite."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', repr(view_func))
+    action = (getattr(view_func, 'actions', None) or {}).get(
+        request.method.lower())
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+def rounded(stats):
+    return {
+        key: round(value, 2) if isinstance(value, float) else value
+        for key, value in stats.items() if key != 'views'
+    }
+
+
+class RequestProfile:
+    """Замеры одного запроса."""
+
+    def __init__(self, method, path, sampled):
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.view = None
+        self.queries = []
+        self.sql_ms = 0.0
+        self.sql_count = 0
+        self.serializer_ms = 0.0
+        self.duration_ms = 0.0
+        self.status_code = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обертка выполнения SQL для connection.execute_wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.sql_count += 1
+            self.sql_ms += duration
+            if self.sampled:
+                self.queries.append((sql, duration))
+            slow_ms = settings.PROFILING_SLOW_QUERY_MS
+            if slow_ms and duration >= slow_ms:
+                logger.warning(
+                    'Медленный запрос %.1f мс в %s %s (%s): %s',
+                    duration, self.method, self.path,
+                    self.view or 'вне представления', sql
+                )
+
+
+class ProfileBuffer:
+    """Кольцевой буфер последних замеренных запросов процесса."""
+
+    def __init__(self, maxsize):
+        self._profiles = deque(maxlen=maxsize)
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def record(self, profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._profiles)
+
+    def top_endpoints(self, limit):
+        endpoints = defaultdict(lambda: {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'sql_count': 0,
+            'sql_ms': 0.0, 'serializer_ms': 0.0,
+        })
+        for profile in self.snapshot():
+            stats = endpoints[(profile.method, profile.view or profile.path)]
+            stats['count'] += 1
+            stats['total_ms'] += profile.duration_ms
+            stats['max_ms'] = max(stats['max_ms'], profile.duration_ms)
+            stats['sql_count'] += profile.sql_count
+            stats['sql_ms'] += profile.sql_ms
+            stats['serializer_ms'] += profile.serializer_ms
+        return [
+            {'method': method, 'view': view, **rounded(stats)}
+            for (method, view), stats in sorted(
+                endpoints.items(), key=lambda item: -item[1]['total_ms']
+            )[:limit]
+        ]
+
+    def top_queries(self, limit):
+        queries = defaultdict(lambda: {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': set(),
+        })
+        for profile in self.snapshot():
+            for sql, duration in profile.queries:
+                stats = queries[normalize_sql(sql)]
+                stats['count'] += 1
+                stats['total_ms'] += duration
+                stats['max_ms'] = max(stats['max_ms'], duration)
+                stats['views'].add(profile.view or profile.path)
+        return [
+            {
+                'sql': sql,
+                **rounded(stats),
+                'views': sorted(stats['views']),
+            }
+            for sql, stats in sorted(
+                queries.items(), key=lambda item: -item[1]['total_ms']
+            )[:limit]
+        ]
+
+
+profiles = ProfileBuffer(settings.PROFILING_BUFFER_SIZE)
+
+
+class SerializerTimingMixin:
+    """Учитывает время сериализации ответа в замерах запроса."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        profile = current_profile.get()
+        if profile is not None and profile.sampled:
+            to_representation = serializer.to_representation
+
+            def timed(instance):
+                start = time.perf_counter()
+                try:
+                    return to_representation(instance)
+                finally:
+                    profile.serializer_ms += (
+                        time.perf_counter() - start) * 1000
+
+            serializer.to_representation = timed
+        return serializer
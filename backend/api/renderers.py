@@ -0,0 +1,104 @@
+import json
+import re
+import uuid
+
+from rest_framework.renderers import JSONRenderer
+
+from .coalescing import aget_or_build, get_or_build
+from .compression import precompress
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Метка, под которой фрагменты проходят через кодировщик. Случайная,
+# чтобы не совпасть с пользовательскими строками.
+FRAGMENT_MARK = f'fragment-{uuid.uuid4().hex}-'
+FRAGMENT = re.compile(rf'"{FRAGMENT_MARK}(\d+)"'.encode())
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class JSONFragment:
+    """Уже закодированный JSON, который вставляется в ответ как есть.
+
+    encodings хранит заранее сжатые варианты для CompressionMiddleware,
+    если фрагмент отдается целиком.
+    """
+
+    __slots__ = ('content', 'encodings')
+
+    def __init__(self, content, encodings=None):
+        self.content = content
+        self.encodings = encodings or {}
+
+
+def encode_fragment(data):
+    content = FastJSONRenderer().render(data)
+    return content, precompress(content)
+
+
+def cached_fragment(key, build, timeout):
+    """Фрагмент из кэша или закодированный и сжатый результат build().
+
+    Запись в кэше сбрасывается при изменении данных, поэтому сжатие
+    выполняется один раз на версию данных. Одновременные промахи
+    считаются одним вызовом build(), см. get_or_build.
+    """
+    return JSONFragment(*get_or_build(
+        key, lambda: encode_fragment(build()), timeout))
+
+
+async def acached_fragment(key, abuild, timeout):
+    """Асинхронный вариант cached_fragment, abuild — корутинная функция."""
+    async def build():
+        return encode_fragment(await abuild())
+
+    return JSONFragment(*await aget_or_build(key, build, timeout))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с запасным вариантом на json.
+
+    Результат совпадает с JSONRenderer DRF, даты и прочие типы вне JSON
+    кодируются его JSONEncoder. Значения JSONFragment вставляются в ответ
+    без повторного кодирования.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        fragments = []
+        encoder = self.encoder_class()
+
+        def default(obj):
+            if isinstance(obj, JSONFragment):
+                fragments.append(obj.content)
+                return f'{FRAGMENT_MARK}{len(fragments) - 1}'
+            return encoder.default(obj)
+
+        if orjson is not None and indent is None and self.compact:
+            content = orjson.dumps(
+                data, default=default, option=ORJSON_OPTIONS)
+        else:
+            content = json.dumps(
+                data, default=default, indent=indent,
+                ensure_ascii=self.ensure_ascii, allow_nan=not self.strict,
+                separators=(
+                    (',', ':') if indent is None and self.compact
+                    else (', ', ': ')
+                )
+            ).encode()
+        # Как в JSONRenderer: разделители строк недопустимы в JavaScript.
+        # Фрагменты уже прошли этот рендерер, поэтому вставляются после.
+        content = content.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+        if fragments:
+            content = FRAGMENT.sub(
+                lambda match: fragments[int(match[1])], content)
+        return content
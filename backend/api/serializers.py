@@ -1,25 +1,52 @@
 from collections import Counter
 
+from django.core.files.uploadedfile import UploadedFile
+from django.urls import reverse
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
 from recipes.models import (
-    FavoriteRecipe, Ingredient, Product,
+    FavoriteRecipe, Ingredient, Job, Product,
     Recipe, ShoppingRecipe, Subscription, Tag, User
 )
 from recipes.constants import MIN_INGREDIENT_AMOUNT, MIN_COOKING_TIME
+from recipes.pantry import ingredient_index
+
+
+class SparseFieldsMixin:
+    """Оставляет в ответе только поля fields, см. parse_sparse_fields."""
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expand = expand
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class UploadImageField(Base64ImageField):
+    """Картинка строкой base64 в JSON или загруженным файлом.
+
+    Файл из multipart или тела запроса уже сохранён обработчиками
+    загрузки и проверяется как в обычном ImageField, без декодирования.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return serializers.ImageField.to_internal_value(self, data)
+        return super().to_internal_value(data)
 
 
 class AvatarSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField(required=True, allow_null=False)
+    avatar = UploadImageField(required=True, allow_null=False)
 
     class Meta:
         model = User
         fields = ('avatar',)
 
 
-class MemberSerializer(UserSerializer):
+class MemberSerializer(SparseFieldsMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = Base64ImageField(read_only=True)
 
@@ -118,7 +145,16 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeMinifiedSerializer(serializers.ModelSerializer):
+class CookableRecipeSerializer(RecipeSerializer):
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = (*RecipeSerializer.Meta.fields, 'coverage')
+
+
+class RecipeMinifiedSerializer(
+    SparseFieldsMixin, serializers.ModelSerializer
+):
 
     class Meta:
         model = Recipe
@@ -150,7 +186,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all()
     )
-    image = Base64ImageField(required=True)
+    image = UploadImageField(required=True)
     cooking_time = serializers.IntegerField(required=True, allow_null=False)
 
     class Meta:
@@ -213,6 +249,8 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                 amount=ingredient_item['amount']
             ) for ingredient_item in ingredients_data
         )
+        # bulk_create не отправляет сигналы, индекс составов обновляем сами.
+        ingredient_index.refresh(recipe.pk)
 
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
@@ -244,11 +282,45 @@ class MemberWithRecipesSerializer(MemberSerializer):
     def get_recipes(self, author):
         request = self.context.get('request')
         recipes_limit = int(request.query_params.get('recipes_limit', 10**10))
-        recipes = author.recipes.all()[:recipes_limit]
-        return RecipeMinifiedSerializer(recipes, many=True).data
+        recipes = author.recipes.all()
+        if self.expand is None:
+            return RecipeMinifiedSerializer(
+                recipes[:recipes_limit], many=True).data
+        if 'recipes' not in self.expand:
+            return list(recipes.values_list('id', flat=True)[:recipes_limit])
+        fields = self.expand['recipes']
+        return RecipeMinifiedSerializer(
+            recipes.only('author', *fields)[:recipes_limit],
+            many=True, fields=fields
+        ).data
 
     def get_recipes_count(self, author):
         return (
             author.recipes_count if hasattr(author, 'recipes_count') else
             author.recipes.count()
         )
+
+
+class JobSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'status', 'attempts', 'created', 'finished',
+            'result', 'url', 'download'
+        )
+
+    def absolute_url(self, name, job):
+        url = reverse(name, args=[job.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_url(self, job):
+        return self.absolute_url('api:job-detail', job)
+
+    def get_download(self, job):
+        if job.status != Job.DONE or not job.result_file:
+            return None
+        return self.absolute_url('api:job-download', job)
@@ -0,0 +1,81 @@
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (
+    Ingredient, Product, Recipe, RecipeShortLink, Tag, User
+)
+from recipes.deletion import recipes_soft_deleted
+from recipes.views import SHORT_LINK_KEY
+from .authentication import invalidate_user_tokens
+from .utils import (
+    INGREDIENTS_JSON_KEY, TAGS_JSON_KEY, invalidate_recipe_json
+)
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    """Выход через djoser удаляет токен — убираем его из кэша."""
+    invalidate_user_tokens(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def drop_changed_user_tokens(sender, instance, **kwargs):
+    """Смена пароля, деактивация и любое другое изменение пользователя."""
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(user_logged_out)
+def drop_logged_out_user_tokens(sender, user, **kwargs):
+    if user is not None:
+        invalidate_user_tokens(user.pk)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def drop_tags_json(sender, **kwargs):
+    cache.delete(TAGS_JSON_KEY)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def drop_ingredients_json(sender, **kwargs):
+    cache.delete(INGREDIENTS_JSON_KEY)
+
+
+def drop_recipe_json(recipe_id):
+    # После фиксации: иначе параллельный запрос закэширует старый состав.
+    transaction.on_commit(lambda: invalidate_recipe_json(recipe_id))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def drop_changed_recipe_json(sender, instance, **kwargs):
+    drop_recipe_json(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Product)
+def drop_changed_products_json(sender, instance, **kwargs):
+    drop_recipe_json(instance.recipe_id)
+
+
+@receiver(recipes_soft_deleted, sender=Recipe)
+def drop_soft_deleted_recipes_json(sender, recipe_ids, **kwargs):
+    for recipe_id in recipe_ids:
+        drop_recipe_json(recipe_id)
+    cache.delete_many([
+        SHORT_LINK_KEY.format(short_code)
+        for short_code in RecipeShortLink.objects.filter(
+            recipe_id__in=recipe_ids).values_list('short_code', flat=True)
+    ])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def drop_changed_tags_json(sender, instance, action, reverse, **kwargs):
+    if action.startswith('post_') and not reverse:
+        drop_recipe_json(instance.pk)
+
+
+@receiver(post_delete, sender=RecipeShortLink)
+def drop_short_link(sender, instance, **kwargs):
+    cache.delete(SHORT_LINK_KEY.format(instance.short_code))
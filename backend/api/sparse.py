@@ -0,0 +1,52 @@
+from rest_framework.exceptions import ValidationError
+
+
+def split_param(query_params, name):
+    return [
+        value.strip() for param in query_params.getlist(name)
+        for value in param.split(',') if value.strip()
+    ]
+
+
+def parse_sparse_fields(query_params, field_names, relations):
+    """Разбирает ?fields= и ?expand=.
+
+    field_names — поля полного ответа по порядку, relations — поля
+    вложенных объектов по связям. Без ?fields= ответ полный и функция
+    возвращает (None, None). Иначе возвращает выбранные поля в порядке
+    полного ответа и словарь раскрытых связей с их полями. Связи, которые
+    не раскрыты через expand или через точку (author.username),
+    отдаются первичными ключами.
+    """
+    requested = split_param(query_params, 'fields')
+    expanded = split_param(query_params, 'expand')
+    unknown = [name for name in expanded if name not in relations]
+    if unknown:
+        raise ValidationError(
+            {'expand': f'Нельзя раскрыть: {", ".join(unknown)}'})
+    if not requested:
+        return None, None
+    fields, expand, unknown = set(), {}, []
+    for name in requested:
+        relation, _, subfield = name.partition('.')
+        if relation not in field_names or subfield and (
+            subfield not in relations.get(relation, ())
+        ):
+            unknown.append(name)
+        elif subfield:
+            expand.setdefault(relation, set()).add(subfield)
+        fields.add(relation)
+    if unknown:
+        raise ValidationError(
+            {'fields': f'Неизвестные поля: {", ".join(unknown)}'})
+    for relation in expanded:
+        fields.add(relation)
+        expand[relation] = set(relations[relation])
+    return (
+        tuple(name for name in field_names if name in fields),
+        {
+            relation: tuple(
+                name for name in relations[relation] if name in subfields)
+            for relation, subfields in expand.items()
+        }
+    )
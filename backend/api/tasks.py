@@ -0,0 +1,15 @@
+from django.core.files.base import ContentFile
+
+from recipes.jobs import task
+from .metrics import SHOPPING_LIST_DOWNLOADS
+from .utils import build_shopping_list
+
+
+@task()
+def shopping_list(job):
+    """Список покупок пользователя задачи в файл результата."""
+    job.result_file.save(
+        'shopping_list.txt', ContentFile(build_shopping_list(job.user)),
+        save=False
+    )
+    SHOPPING_LIST_DOWNLOADS.inc()
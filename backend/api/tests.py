@@ -0,0 +1,196 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from urllib.parse import urlsplit
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import User
+
+from .authentication import (
+    USER_VERSION_KEY, CachedTokenAuthentication, token_cache
+)
+from .db_routers import replica_reads
+from .middleware import ReplicaRoutingMiddleware
+from .pagination import KeysetPagination
+from .throttling import parse_rate, take_token
+
+
+class TokenBucketTests(TestCase):
+    """Корзина токенов: списание, ожидание и наполнение со временем."""
+
+    key = 'test:user:1'
+
+    def take(self, now, capacity=2, period=60):
+        with mock.patch('api.throttling.time.time', return_value=now):
+            return take_token(self.key, capacity, period)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/min'), (10, 60))
+        self.assertEqual(parse_rate('100/day'), (100, 24 * 60 * 60))
+
+    def test_empty_bucket_reports_wait(self):
+        self.assertIsNone(self.take(1000))
+        self.assertIsNone(self.take(1000))
+        # Два токена за 60 секунд: следующий появится через 30.
+        self.assertAlmostEqual(self.take(1000), 30)
+        self.assertAlmostEqual(self.take(1010), 20)
+
+    def test_bucket_refills(self):
+        self.take(1000)
+        self.take(1000)
+        self.assertIsNone(self.take(1030))
+        self.assertIsNotNone(self.take(1030))
+
+    def test_refill_is_capped_by_capacity(self):
+        self.take(1000)
+        # За час простоя корзина наполняется только до ёмкости.
+        self.assertIsNone(self.take(4600))
+        self.assertIsNone(self.take(4600))
+        self.assertIsNotNone(self.take(4600))
+
+
+class KeysetPaginationTests(TestCase):
+    """Курсор следующей страницы продолжает выдачу без пропусков."""
+
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        # Несколько позиций с одной датой: порядок решает id.
+        self.positions = sorted((
+            (start + timedelta(minutes=pk // 3), pk) for pk in range(1, 12)
+        ), reverse=True)
+
+    def read_page(self, cursor, limit):
+        return [
+            position for position in self.positions
+            if cursor is None or position < cursor
+        ][:limit]
+
+    def paginate(self, url):
+        paginator = KeysetPagination()
+        page = paginator.paginate_positions(
+            self.read_page, Request(self.factory.get(url)))
+        return page, paginator.get_next_link()
+
+    def test_cursor_round_trip(self):
+        position = self.positions[4]
+        paginator = KeysetPagination()
+        request = Request(self.factory.get(
+            '/api/recipes/feed/',
+            {'cursor': paginator.encode_cursor(position)}
+        ))
+        self.assertEqual(paginator.decode_cursor(request), position)
+
+    def test_pages_cover_all_positions(self):
+        pks, url = [], '/api/recipes/feed/?limit=4'
+        while url:
+            page, next_link = self.paginate(url)
+            pks.extend(page)
+            url = next_link and urlsplit(next_link)._replace(
+                scheme='', netloc='').geturl()
+        self.assertEqual(pks, [pk for _, pk in self.positions])
+
+    def test_invalid_cursor(self):
+        request = Request(self.factory.get(
+            '/api/recipes/feed/', {'cursor': 'не курсор'}))
+        with self.assertRaises(NotFound):
+            KeysetPagination().decode_cursor(request)
+
+
+def replica_view(request):
+    return HttpResponse()
+
+
+replica_view.read_from_replica = True
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaPinTests(TestCase):
+    """После записи клиент читает основную БД READ_YOUR_WRITES_SECONDS."""
+
+    factory = RequestFactory()
+
+    def setUp(self):
+        cache.clear()
+        # Кэш тестов в памяти, поэтому middleware создаётся без реплик.
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.middleware = ReplicaRoutingMiddleware(self.respond)
+
+    def respond(self, request):
+        self.middleware.process_view(request, replica_view, (), {})
+        self.replica_reads = replica_reads.get()
+        return HttpResponse(status=self.status)
+
+    def request(self, method, token='Token one', status=200):
+        self.status = status
+        self.middleware(getattr(self.factory, method)(
+            '/api/recipes/', HTTP_AUTHORIZATION=token))
+        return self.replica_reads
+
+    def test_reads_go_to_replica(self):
+        self.assertTrue(self.request('get'))
+        self.assertFalse(replica_reads.get())
+
+    def test_write_pins_client_to_primary(self):
+        self.request('post', status=201)
+        self.assertFalse(self.request('get'))
+        self.assertTrue(self.request('get', token='Token other'))
+
+    def test_failed_write_does_not_pin(self):
+        self.request('post', status=400)
+        self.assertTrue(self.request('get'))
+
+    def test_pin_expires(self):
+        with self.settings(READ_YOUR_WRITES_SECONDS=-1):
+            self.request('post', status=201)
+        self.assertTrue(self.request('get'))
+
+    def test_requires_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(self.respond)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Отзыв в другом воркере виден через версию в общем кэше."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(
+            'reader', 'reader@example.com', 'password',
+            first_name='Читатель', last_name='Рецептов'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.authentication.authenticate_credentials(self.token.key)
+
+    def test_cache_hit_skips_database(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual(user, self.user)
+
+    def test_version_change_rereads_user(self):
+        self.authenticate()
+        # Другой воркер отключил пользователя: его память не сброшена,
+        # меняется только версия в общем кэше.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.set(USER_VERSION_KEY.format(self.user.pk), 'other', None)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deleted_token_is_rejected(self):
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
@@ -0,0 +1,92 @@
+import random
+import time
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Least
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from .models import ThrottleBucket
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+# Доля запросов, которые заодно удаляют давно полные корзины.
+PURGE_PROBABILITY = 0.001
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60): ёмкость корзины и период её наполнения."""
+    capacity, period = rate.split('/')
+    return int(capacity), PERIODS[period[0]]
+
+
+def take_token(key, capacity, period):
+    """Берёт токен из корзины. Возвращает None или секунды до токена.
+
+    Корзина наполняется на capacity токенов за period секунд. Проверка
+    и списание — один UPDATE, поэтому воркеры и потоки не спорят за
+    токены и не нужен отдельный Redis.
+    """
+    now = time.time()
+    rate = capacity / period
+    available = Least(
+        Value(float(capacity)),
+        F('tokens') + (Value(now) - F('updated')) * Value(rate)
+    )
+    buckets = ThrottleBucket.objects.filter(key=key)
+    if buckets.alias(available=available).filter(
+        available__gte=1
+    ).update(tokens=available - 1, updated=now):
+        return None
+    bucket, created = ThrottleBucket.objects.get_or_create(
+        key=key, defaults={'tokens': capacity - 1, 'updated': now})
+    if created:
+        return None
+    tokens = min(capacity, bucket.tokens + (now - bucket.updated) * rate)
+    return (1 - tokens) / rate
+
+
+def purge_buckets():
+    """Удаляет корзины, которые за сутки наверняка наполнились."""
+    ThrottleBucket.objects.filter(
+        updated__lt=time.time() - PERIODS['d']).delete()
+
+
+def check_rate(request, scope, get_ident):
+    """Берёт токен области scope для клиента запроса, см. take_token."""
+    rate = settings.THROTTLE_RATES.get(scope)
+    if rate is None:
+        return None
+    if random.random() < PURGE_PROBABILITY:
+        purge_buckets()
+    user = request.user
+    ident = (
+        f'user:{user.pk}' if user and user.is_authenticated
+        else f'ip:{get_ident(request)}'
+    )
+    return take_token(f'{scope}:{ident}', *parse_rate(rate))
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Ограничение частоты по корзине токенов для действий вьюсета.
+
+    Вьюсет задаёт throttle_scopes: действие -> область, частоты областей
+    берутся из THROTTLE_RATES. Корзина своя у каждого пользователя, у
+    анонимов — у каждого IP. Действия без области не ограничиваются.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scopes', {}).get(
+            getattr(view, 'action', None))
+        self.wait_seconds = check_rate(request, scope, self.get_ident)
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def throttle(request, scope):
+    """Проверка области из кода вьюхи, в том числе асинхронной."""
+    wait = check_rate(request, scope, BaseThrottle().get_ident)
+    if wait is not None:
+        raise Throttled(wait)
@@ -1,8 +1,11 @@
+from django.conf import settings
 from rest_framework.routers import DefaultRouter
 from django.urls import include, path
 
+from api import async_views
 from api.views import (
-    IngredientViewSet, RecipeViewSet, TagViewSet, MemberViewSet
+    DiagnosticsViewSet, IngredientViewSet, JobViewSet, RecipeViewSet,
+    TagViewSet, MemberViewSet
 )
 
 
@@ -13,9 +16,17 @@ router.register('recipes', RecipeViewSet, basename='recipe')
 router.register('ingredients', IngredientViewSet, basename='ingredient')
 router.register('tags', TagViewSet, basename='tag')
 router.register('users', MemberViewSet, basename='user')
+router.register('jobs', JobViewSet, basename='job')
+router.register('diagnostics', DiagnosticsViewSet, basename='diagnostics')
 
+async_urlpatterns = [
+    path('recipes/', async_views.recipes, name='recipe-list'),
+    path('recipes/<int:pk>/', async_views.recipe, name='recipe-detail'),
+    path('ingredients/', async_views.ingredients, name='ingredient-list'),
+]
 
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
+    *(async_urlpatterns if settings.ASGI_ENABLED else []),
     path('', include(router.urls)),
 ]
@@ -1,17 +1,50 @@
+import hashlib
 import random
 import string
+import uuid
 from datetime import datetime
 
-from recipes.models import RecipeShortLink
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Sum
+from django.utils.encoding import smart_bytes
+
+from recipes.models import Ingredient, Recipe, RecipeShortLink, Tag
+from recipes.units import aggregate_amounts
+
+from .renderers import cached_fragment
+from .serializers import IngredientSerializer, TagSerializer
+
+TAGS_JSON_KEY = 'api:tags-json'
+INGREDIENTS_JSON_KEY = 'api:ingredients-json'
+RECIPE_VERSION_KEY = 'api:recipe-version:{}'
+
+
+def build_shopping_list(user):
+    """Текст списка покупок пользователя в байтах."""
+    shopping_recipes = Recipe.objects.filter(shoppingrecipes__user=user)
+    # Группировка по id ингредиента дешевле, чем по текстовым колонкам:
+    # на PostgreSQL GROUP BY сводится к первичному ключу.
+    products = (
+        Ingredient.objects.filter(products__recipe__in=shopping_recipes)
+        .values_list('id', 'name', 'measurement_unit')
+        .annotate(total_amount=Sum('products__amount'))
+        .order_by()
+    )
+    return smart_bytes(render_shopping_list(
+        aggregate_amounts(
+            (name, unit, amount) for _, name, unit, amount in products),
+        shopping_recipes
+    ))
 
 
 def render_shopping_list(products, recipes):
+    """products — тройки (название, единица, количество)."""
     today = datetime.now().strftime('%d-%m-%Y')
     products_info = [
-        f"{i}. {product['ingredient__name'].capitalize()} "
-        f"({product['ingredient__measurement_unit']}) — "
-        f"{product['total_amount']}"
-        for i, product in enumerate(products, start=1)
+        f"{i}. {name.capitalize()} ({unit}) — {amount}"
+        for i, (name, unit, amount) in enumerate(products, start=1)
     ]
     recipes_names = [recipe.name for recipe in recipes]
 
@@ -31,3 +64,76 @@ def generate_unique_short_code():
         )
         if not RecipeShortLink.objects.filter(short_code=short_code).exists():
             return short_code
+
+
+def get_db_connection_stats():
+    """Состояние соединений с БД текущего процесса по каждому алиасу."""
+    stats = {}
+    for connection in connections.all():
+        pool = getattr(connection, 'pool', None)
+        if pool is None:
+            stats[connection.alias] = {
+                'vendor': connection.vendor,
+                'pool': False,
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'health_checks': connection.settings_dict[
+                    'CONN_HEALTH_CHECKS'],
+                'connected': connection.connection is not None,
+            }
+            continue
+        pool_stats = pool.get_stats()
+        stats[connection.alias] = {
+            'vendor': connection.vendor,
+            'pool': True,
+            'min_size': pool_stats['pool_min'],
+            'max_size': pool_stats['pool_max'],
+            'size': pool_stats['pool_size'],
+            'in_use': pool_stats['pool_size'] - pool_stats['pool_available'],
+            'available': pool_stats['pool_available'],
+            'waiting': pool_stats['requests_waiting'],
+            'requests': pool_stats.get('requests_num', 0),
+            'waits': pool_stats.get('requests_queued', 0),
+            'wait_ms': pool_stats.get('requests_wait_ms', 0),
+            'timeouts': pool_stats.get('requests_errors', 0),
+            'connections_lost': pool_stats.get('connections_lost', 0),
+        }
+    return stats
+
+
+def get_tags_json():
+    """Закодированный список всех тегов."""
+    return cached_fragment(
+        TAGS_JSON_KEY,
+        lambda: TagSerializer(Tag.objects.all(), many=True).data,
+        settings.REFERENCE_CACHE_TTL
+    )
+
+
+def get_ingredients_json():
+    """Закодированный список всех ингредиентов без фильтров."""
+    return cached_fragment(
+        INGREDIENTS_JSON_KEY,
+        lambda: IngredientSerializer(
+            Ingredient.objects.all(), many=True).data,
+        settings.REFERENCE_CACHE_TTL
+    )
+
+
+def recipe_json_key(request, pk):
+    """Ключ кэша карточки рецепта для анонимов.
+
+    Адрес запроса входит в ключ: от хоста зависят ссылки на картинки,
+    от ?fields= — состав ответа. Версия рецепта меняется при его
+    изменении, и прежние записи перестают читаться.
+    """
+    version = cache.get(RECIPE_VERSION_KEY.format(pk), 0)
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'api:recipe-json:{pk}:{version}:{url}'
+
+
+def invalidate_recipe_json(pk):
+    # Версия живёт не меньше записей прежней версии, после неё их уже нет.
+    cache.set(
+        RECIPE_VERSION_KEY.format(pk), uuid.uuid4().hex,
+        settings.RECIPE_CACHE_TTL
+    )
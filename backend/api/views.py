@@ -1,9 +1,15 @@
+import os
+
+from django.conf import settings
 from django.core.files.base import ContentFile
-from django.db.models import Count, Exists, OuterRef, Sum, Value, BooleanField
-from django.http import FileResponse
+from django.db.models import (
+    BooleanField, Count, Exists, OuterRef, Prefetch, Q, Value
+)
+from django.http import FileResponse, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.utils.encoding import smart_bytes
+from django.utils.functional import cached_property
+from djoser.utils import logout_user
 from djoser.views import UserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
@@ -11,37 +17,59 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import (
-    AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+    AllowAny, IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 )
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from recipes.models import (
-    FavoriteRecipe, Ingredient, Product, Recipe, RecipeShortLink,
-    ShoppingRecipe, Subscription, Tag, User
+    FavoriteRecipe, Ingredient, Job, Product, Recipe, RecipeEvent,
+    RecipeShortLink, ShoppingRecipe, Subscription, Tag, User
+)
+from recipes.events import record_event
+from recipes.deletion import soft_delete_recipes, soft_delete_user
+from recipes.feed import read_feed
+from recipes.jobs import enqueue
+from recipes.pantry import ingredient_index
+from .fast_serializers import (
+    FastCookableRecipeSerializer, FastRecipeSerializer
 )
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import PageNumberLimitPagination
+from .metrics import RECIPES_CREATED, SHOPPING_LIST_DOWNLOADS, render_metrics
+from .pagination import KeysetPagination, PageNumberLimitPagination
+from .parsers import ImageUploadParser
 from .permissions import IsAuthorOrReadOnly
+from .profiling import SerializerTimingMixin, profiles
+from .renderers import cached_fragment
+from .sparse import parse_sparse_fields
+from .throttling import throttle
 from .serializers import (
-    AvatarSerializer, MemberSerializer,
+    AvatarSerializer, JobSerializer, MemberSerializer,
     MemberWithRecipesSerializer, IngredientSerializer,
     RecipeWriteSerializer, RecipeSerializer,
     RecipeMinifiedSerializer, TagSerializer
 )
 from .utils import (
-    generate_unique_short_code, render_shopping_list
+    build_shopping_list, generate_unique_short_code, get_db_connection_stats,
+    get_ingredients_json, get_tags_json, recipe_json_key
 )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(SerializerTimingMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов (только list и detail)"""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    read_from_replica = True
+
+    def list(self, request, *args, **kwargs):
+        return Response(get_tags_json())
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    SerializerTimingMixin, viewsets.ReadOnlyModelViewSet
+):
     """Вьюсет для отображения ингредиентов (только list и detail)"""
 
     queryset = Ingredient.objects.all()
@@ -51,18 +79,31 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['^name']
     filterset_fields = ('name',)
     filterset_class = IngredientFilter
+    read_from_replica = True
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('name') or request.query_params.get(
+                'search'):
+            throttle(request, 'ingredient_search')
+            return super().list(request, *args, **kwargs)
+        return Response(get_ingredients_json())
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     """Вьюсет для CRUD операций для рецептов"""
 
     permission_classes = (IsAuthorOrReadOnly, IsAuthenticatedOrReadOnly)
     pagination_class = PageNumberLimitPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    read_from_replica = True
+    throttle_scopes = {
+        'download_shopping_cart': 'shopping_cart',
+        'get_link': 'short_link',
+    }
 
-    def annotate_recipes(self, recipes):
-        user = self.request.user
+    @staticmethod
+    def annotate_recipes(recipes, user):
         return (
             recipes.annotate(
                 is_favorited=Exists(FavoriteRecipe.objects.filter(
@@ -76,19 +117,79 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         )
 
-    def get_queryset(self):
+    @classmethod
+    def read_queryset(cls, user, query_params, fields=None, expand=None):
+        """Рецепты для чтения, при ?fields= только с нужными данными."""
         recipes = Recipe.objects.select_related('author').prefetch_related(
-            'tags', 'ingredients', 'products')
+            'tags', Prefetch(
+                'products',
+                queryset=Product.objects.select_related('ingredient')
+            )
+        )
+        if fields is None:
+            return cls.annotate_recipes(recipes, user)
+        recipes = FastRecipeSerializer.prepare_queryset(
+            recipes, fields, expand)
+        # Флаги нужны и для вывода, и для фильтров по ним.
+        if {'is_favorited', 'is_in_shopping_cart'} & {
+            *fields, *query_params
+        }:
+            return cls.annotate_recipes(recipes, user)
+        return recipes
+
+    @cached_property
+    def sparse_fields(self):
+        if self.action not in (
+            'list', 'retrieve', 'feed', 'similar', 'cookable'
+        ):
+            return None, None
+        serializer = (
+            FastCookableRecipeSerializer if self.action == 'cookable'
+            else FastRecipeSerializer
+        )
+        return parse_sparse_fields(
+            self.request.query_params, serializer.field_names,
+            serializer.relations
+        )
 
-        return self.annotate_recipes(recipes)
+    def get_queryset(self):
+        return self.read_queryset(
+            self.request.user, self.request.query_params,
+            *self.sparse_fields
+        )
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return RecipeWriteSerializer
+        if self.action in ['list', 'retrieve']:
+            return FastRecipeSerializer
         return RecipeSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ['list', 'retrieve']:
+            kwargs['fields'], kwargs['expand'] = self.sparse_fields
+        return super().get_serializer(*args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        RECIPES_CREATED.inc()
+
+    def perform_destroy(self, instance):
+        soft_delete_recipes(Recipe.objects.filter(pk=instance.pk))
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            response = super().retrieve(request, *args, **kwargs)
+        else:
+            # Анонимам карточка одинакова: одна сборка на всех.
+            response = Response(cached_fragment(
+                recipe_json_key(request, kwargs['pk']),
+                lambda: super(RecipeViewSet, self).retrieve(
+                    request, *args, **kwargs).data,
+                settings.RECIPE_CACHE_TTL
+            ))
+        record_event(RecipeEvent.VIEW, int(kwargs['pk']), request.user)
+        return response
 
     @staticmethod
     def handle_favorite_shopping_actions(
@@ -133,27 +234,87 @@ class RecipeViewSet(viewsets.ModelViewSet):
             url_path='download_shopping_cart')
     def download_shopping_cart(self, request):
         user = request.user
-        shopping_recipes = Recipe.objects.filter(
-            shoppingrecipes__user=user)
-        products = (
-            Product.objects.filter(recipe__in=shopping_recipes)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(total_amount=Sum('amount'))
-            .order_by('ingredient__name')
-        )
-        shopping_list = smart_bytes(
-            render_shopping_list(products, shopping_recipes)
-        )
+        # Большой список собирается фоновой задачей, клиент получает её
+        # адрес и скачивает файл, когда задача выполнена.
+        if ShoppingRecipe.objects.filter(
+            user=user, recipe__deleted_at__isnull=True
+        ).count() > settings.SHOPPING_LIST_SYNC_LIMIT:
+            job = enqueue('shopping_list', user=user)
+            return Response(
+                JobSerializer(job, context={'request': request}).data,
+                status=status.HTTP_202_ACCEPTED
+            )
+        SHOPPING_LIST_DOWNLOADS.inc()
 
         return FileResponse(
-            ContentFile(shopping_list),
+            ContentFile(build_shopping_list(user)),
             as_attachment=True,
             filename='shopping_list.txt',
             content_type='text/plain; charset=utf-8'
         )
 
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated], url_path='feed')
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        paginator = KeysetPagination()
+        page = paginator.paginate_positions(
+            lambda cursor, limit: read_feed(request.user, cursor, limit),
+            request
+        )
+        recipes = self.get_queryset().in_bulk(page)
+        fields, expand = self.sparse_fields
+        return paginator.get_paginated_response(FastRecipeSerializer(
+            [recipes[pk] for pk in page if pk in recipes],
+            many=True, context={'request': request},
+            fields=fields, expand=expand
+        ).data)
+
     @action(detail=True, methods=['get'],
-            permission_classes=[AllowAny], url_path='get-link')
+            permission_classes=[AllowAny], url_path='similar')
+    def similar(self, request, pk=None):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        recipes = self.get_queryset().filter(
+            similar_to__recipe=recipe).order_by('-similar_to__score')
+        fields, expand = self.sparse_fields
+        return Response(FastRecipeSerializer(
+            recipes, many=True, context={'request': request},
+            fields=fields, expand=expand
+        ).data)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[AllowAny], url_path='cookable')
+    def cookable(self, request):
+        """Рецепты по убыванию доли продуктов, которые есть у пользователя."""
+        try:
+            pantry = {
+                int(ingredient_id)
+                for value in request.query_params.getlist('ingredients')
+                for ingredient_id in value.split(',') if ingredient_id
+            }
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Укажите id ингредиентов через запятую'})
+        if not pantry:
+            raise ValidationError(
+                {'ingredients': 'Обязательный параметр'})
+        ranking = ingredient_index.rank(pantry)
+        paginator = PageNumberLimitPagination()
+        page = dict(paginator.paginate_queryset(ranking, request))
+        recipes = self.get_queryset().in_bulk(page)
+        for recipe_id, coverage in page.items():
+            if recipe_id in recipes:
+                recipes[recipe_id].coverage = coverage
+        recipes = [recipes[id] for id in page if id in recipes]
+        fields, expand = self.sparse_fields
+        return paginator.get_paginated_response(FastCookableRecipeSerializer(
+            recipes, many=True, context={'request': request},
+            fields=fields, expand=expand
+        ).data)
+
+    @action(detail=True, methods=['get'],
+            permission_classes=[AllowAny], url_path='get-link',
+            read_from_replica=False)
     def get_link(self, request, pk=None):
         if not Recipe.objects.filter(pk=pk).exists():
             raise ValidationError({'detail': f'Рецепта {pk} не существует'})
@@ -170,32 +331,74 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response({'short-link': full_url})
 
 
-class MemberViewSet(UserViewSet):
+class MemberViewSet(SerializerTimingMixin, UserViewSet):
     """Вьюсет для работы с пользователями."""
     permission_classes = (IsAuthenticatedOrReadOnly, )
     queryset = User.objects.all()
     serializer_class = MemberSerializer
     pagination_class = PageNumberLimitPagination
+    read_from_replica = True
+    # Поле, в которое ImageUploadParser кладёт картинку из тела запроса.
+    upload_field = 'avatar'
 
     def get_permissions(self):
         if self.action == 'me':
             return [IsAuthenticated()]
         return super().get_permissions()
 
+    @cached_property
+    def sparse_fields(self):
+        if self.request.method != 'GET':
+            return None, None
+        if self.action == 'subscriptions':
+            return parse_sparse_fields(
+                self.request.query_params,
+                MemberWithRecipesSerializer.Meta.fields,
+                {'recipes': RecipeMinifiedSerializer.Meta.fields}
+            )
+        if self.action in ('list', 'retrieve', 'me'):
+            return parse_sparse_fields(
+                self.request.query_params, MemberSerializer.Meta.fields, {})
+        return None, None
+
+    def get_serializer(self, *args, **kwargs):
+        # Удаление через me проверяет пароль своим сериализатором.
+        if self.request.method == 'GET' and self.action in (
+            'list', 'retrieve', 'me'
+        ):
+            kwargs['fields'], kwargs['expand'] = self.sparse_fields
+        return super().get_serializer(*args, **kwargs)
+
     def get_queryset(self):
         user = self.request.user
+        users = User.objects.filter(deleted_at__isnull=True)
+        fields, _ = self.sparse_fields
+        if fields is not None:
+            users = users.only(*(
+                name for name in fields if name != 'is_subscribed'
+            ))
+            if 'is_subscribed' not in fields:
+                return users
         return (
-            User.objects.annotate(is_subscribed=Exists(
+            users.annotate(is_subscribed=Exists(
                 Subscription.objects.filter(
                     user=user, author=OuterRef('pk'))
             )) if user.is_authenticated else
-            User.objects.annotate(is_subscribed=Value(
+            users.annotate(is_subscribed=Value(
                 False, output_field=BooleanField()
             ))
         )
 
+    def perform_destroy(self, instance):
+        # Как в djoser, но вместо каскада пользователь только помечается.
+        if instance == self.request.user:
+            logout_user(self.request)
+        soft_delete_user(instance)
+
     @action(detail=False, methods=['put', 'delete'], url_path='me/avatar',
-            permission_classes=(IsAuthenticated,))
+            permission_classes=(IsAuthenticated,),
+            parser_classes=(
+                *api_settings.DEFAULT_PARSER_CLASSES, ImageUploadParser))
     def manage_avatar(self, request):
         user = request.user
         if request.method == 'PUT':
@@ -222,7 +425,8 @@ class MemberViewSet(UserViewSet):
             permission_classes=[IsAuthenticated], url_path='subscribe')
     def manage_subscription(self, request, id=None):
         user = request.user
-        author = get_object_or_404(User, pk=id)
+        author = get_object_or_404(
+            User.objects.filter(deleted_at__isnull=True), pk=id)
 
         if user == author:
             raise ValidationError(
@@ -251,8 +455,11 @@ class MemberViewSet(UserViewSet):
             permission_classes=[IsAuthenticated], url_path='subscriptions')
     def subscriptions(self, request):
         user = request.user
-        subscriptions = user.subscriptions.select_related('author').annotate(
-            recipes_count=Count('author__recipes'),
+        subscriptions = user.subscriptions.filter(
+            author__deleted_at__isnull=True
+        ).select_related('author').annotate(
+            recipes_count=Count('author__recipes', filter=Q(
+                author__recipes__deleted_at__isnull=True)),
             is_subscribed=Value(True, output_field=BooleanField())
         )
         authors = [subscription.author for subscription in subscriptions]
@@ -260,9 +467,62 @@ class MemberViewSet(UserViewSet):
         paginated_subscriptions = paginator.paginate_queryset(
             authors, request
         )
+        fields, expand = self.sparse_fields
         return paginator.get_paginated_response(
             MemberWithRecipesSerializer(
                 paginated_subscriptions,
                 context={'request': request},
-                many=True).data
+                many=True, fields=fields, expand=expand).data
+        )
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Фоновые задачи пользователя: статус и файл результата."""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).order_by('-id')
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.DONE or not job.result_file:
+            raise ValidationError({'detail': 'Файл ещё не готов'})
+        return FileResponse(
+            job.result_file.open('rb'), as_attachment=True,
+            filename=job.name + os.path.splitext(job.result_file.name)[1]
         )
+
+
+class DiagnosticsViewSet(viewsets.ViewSet):
+    """Диагностика процесса для администраторов."""
+
+    permission_classes = (IsAdminUser,)
+
+    @action(detail=False, methods=['get'], url_path='db')
+    def db(self, request):
+        return Response(get_db_connection_stats())
+
+    @action(detail=False, methods=['get', 'delete'])
+    def profile(self, request):
+        """Самые затратные представления и запросы из выборки процесса."""
+        if request.method == 'DELETE':
+            profiles.clear()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число.'})
+        return Response({
+            'sampled_requests': len(profiles),
+            'endpoints': profiles.top_endpoints(limit),
+            'queries': profiles.top_queries(limit),
+        })
+
+
+def metrics(request):
+    """Метрики для Prometheus, снаружи закрыты nginx."""
+    content, content_type = render_metrics()
+    return HttpResponse(content, content_type=content_type)
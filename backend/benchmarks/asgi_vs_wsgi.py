@@ -0,0 +1,118 @@
+"""Сравнение WSGI- и ASGI-развёртывания при одинаковом бюджете памяти.
+
+Запускает gunicorn с конфигурацией gunicorn.conf.py в обоих режимах,
+нагружает горячие GET-эндпоинты заданным числом одновременных клиентов
+и выводит пропускную способность, задержки и суммарный RSS воркеров.
+
+    python benchmarks/asgi_vs_wsgi.py --concurrency 64 --duration 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import urlopen
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PATHS = (
+    '/api/recipes/', '/api/recipes/?page=2', '/api/ingredients/?name=%D0%B0'
+)
+
+
+def rss_mb(pid):
+    """Суммарный RSS мастер-процесса gunicorn и его воркеров."""
+    pids = [pid] + [
+        int(child) for child in Path(
+            f'/proc/{pid}/task/{pid}/children').read_text().split()
+    ]
+    total = 0
+    for process_id in pids:
+        for line in Path(f'/proc/{process_id}/status').read_text().split('\n'):
+            if line.startswith('VmRSS:'):
+                total += int(line.split()[1])
+    return total / 1024
+
+
+def start_server(asgi, workers, port):
+    env = {
+        **os.environ,
+        'ASGI_ENABLED': str(asgi),
+        'GUNICORN_WORKERS': str(workers),
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+        cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            urlopen(f'http://127.0.0.1:{port}{PATHS[0]}', timeout=1).read()
+            return server
+        except (URLError, ConnectionError):
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError('Сервер не запустился')
+
+
+def load(port, concurrency, duration):
+    deadline = time.monotonic() + duration
+
+    def client(number):
+        latencies, errors = [], 0
+        while time.monotonic() < deadline:
+            url = f'http://127.0.0.1:{port}{PATHS[number % len(PATHS)]}'
+            started = time.perf_counter()
+            try:
+                urlopen(url, timeout=30).read()
+                latencies.append(time.perf_counter() - started)
+            except (URLError, ConnectionError):
+                errors += 1
+            number += 1
+        return latencies, errors
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(client, range(concurrency)))
+    latencies = sorted(sum((result[0] for result in results), []))
+    return latencies, sum(result[1] for result in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--wsgi-workers', type=int, default=4)
+    parser.add_argument('--asgi-workers', type=int, default=1)
+    parser.add_argument('--port', type=int, default=8011)
+    args = parser.parse_args()
+
+    print(f'{"режим":<6}{"воркеры":>9}{"RSS, МБ":>10}{"RPS":>9}'
+          f'{"p50, мс":>10}{"p99, мс":>10}{"ошибки":>8}')
+    for asgi, workers in ((False, args.wsgi_workers),
+                          (True, args.asgi_workers)):
+        server = start_server(asgi, workers, args.port)
+        try:
+            latencies, errors = load(
+                args.port, args.concurrency, args.duration)
+            memory = rss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        if not latencies:
+            print(f'{"ASGI" if asgi else "WSGI":<6} нет успешных ответов')
+            continue
+        print(
+            f'{"ASGI" if asgi else "WSGI":<6}{workers:>9}{memory:>10.1f}'
+            f'{len(latencies) / args.duration:>9.1f}'
+            f'{statistics.median(latencies) * 1000:>10.1f}'
+            f'{latencies[int(len(latencies) * 0.99)] * 1000:>10.1f}'
+            f'{errors:>8}'
+        )
+
+
+if __name__ == '__main__':
+    main()
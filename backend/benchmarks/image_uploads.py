@@ -0,0 +1,95 @@
+"""Пиковая память при загрузке картинки разными способами.
+
+Собирает запрос смены аватара с картинкой заданного размера: base64 в
+JSON, multipart и картинкой телом запроса. Для каждого разбирает тело
+парсерами API и проверяет AvatarSerializer, как manage_avatar, и
+выводит пиковый прирост памяти по tracemalloc. Тело запроса создается
+до начала замера: в воркере его держит не Python, а сокет и nginx.
+
+    python benchmarks/image_uploads.py --megabytes 5
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+
+import django
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+django.setup()
+
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.client import (  # noqa: E402
+    BOUNDARY, MULTIPART_CONTENT, encode_multipart
+)
+from PIL import Image  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.settings import api_settings  # noqa: E402
+
+from api.parsers import ImageUploadParser  # noqa: E402
+from api.serializers import AvatarSerializer  # noqa: E402
+from api.views import MemberViewSet  # noqa: E402
+
+
+def make_png(megabytes):
+    """PNG из шума: почти не сжимается, размер близок к заданному."""
+    side = int((megabytes * 2 ** 20 / 3) ** 0.5)
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(
+        buffer, 'PNG', compress_level=1)
+    return buffer.getvalue()
+
+
+def requests(png):
+    factory = RequestFactory()
+    url = '/api/users/me/avatar/'
+    encoded = base64.b64encode(png).decode()
+    return (
+        ('base64 в JSON', factory.put(url, json.dumps(
+            {'avatar': f'data:image/png;base64,{encoded}'}
+        ), content_type='application/json')),
+        ('multipart', factory.put(url, encode_multipart(BOUNDARY, {
+            'avatar': SimpleUploadedFile('avatar.png', png, 'image/png')
+        }), content_type=MULTIPART_CONTENT)),
+        ('тело запроса', factory.put(
+            url, png, content_type='image/png')),
+    )
+
+
+def measure(request):
+    view = MemberViewSet()
+    request = Request(request, parsers=[
+        parser() for parser in (
+            *api_settings.DEFAULT_PARSER_CLASSES, ImageUploadParser)
+    ], parser_context={'view': view, 'kwargs': {}})
+    tracemalloc.start()
+    serializer = AvatarSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    serializer.validated_data['avatar'].close()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--megabytes', type=float, default=5)
+    args = parser.parse_args()
+
+    png = make_png(args.megabytes)
+    print(f'картинка: {len(png) / 2 ** 20:.1f} МБ')
+    print(f'{"способ":<16}{"пик, МБ":>10}')
+    for name, request in requests(png):
+        peak = measure(request)
+        print(f'{name:<16}{peak / 2 ** 20:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Сравнение JSONRenderer DRF и FastJSONRenderer.
+
+Кодирует типичные ответы API: полный список ингредиентов, страницу
+рецептов и тот же список ингредиентов из готового фрагмента. Для каждого
+варианта выводит процессорное время на ответ и пропускную способность
+в мегабайтах JSON в секунду.
+
+    python benchmarks/json_renderers.py --ingredients 2000 --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.renderers import FastJSONRenderer, JSONFragment, orjson  # noqa: E402
+
+
+def ingredients(count):
+    return [
+        {'id': number, 'name': f'ингредиент {number}',
+         'measurement_unit': 'г'}
+        for number in range(count)
+    ]
+
+
+def recipe_page(recipes, products):
+    author = {
+        'email': 'author@example.com', 'id': 1, 'username': 'author',
+        'first_name': 'Автор', 'last_name': 'Рецептов',
+        'is_subscribed': False,
+        'avatar': 'http://localhost/media/users/avatar.png',
+    }
+    return {
+        'count': 1000, 'next': 'http://localhost/api/recipes/?page=2',
+        'previous': None,
+        'results': [{
+            'id': number,
+            'tags': [{'id': 1, 'name': 'Завтрак', 'slug': 'breakfast'}],
+            'author': author,
+            'ingredients': [
+                {'id': product, 'name': f'продукт {product}',
+                 'measurement_unit': 'г', 'amount': 100}
+                for product in range(products)
+            ],
+            'is_favorited': False, 'is_in_shopping_cart': False,
+            'name': f'Рецепт {number}',
+            'image': 'http://localhost/media/recipes/images/image.png',
+            'text': 'Описание рецепта. ' * 30, 'cooking_time': 30,
+        } for number in range(recipes)],
+    }
+
+
+def measure(render, data, repeat):
+    content = render(data)
+    start = time.process_time()
+    for _ in range(repeat):
+        render(data)
+    seconds = (time.process_time() - start) / repeat
+    return content, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--ingredients', type=int, default=2000)
+    parser.add_argument('--recipes', type=int, default=10)
+    parser.add_argument('--products', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    drf = JSONRenderer().render
+    fast = FastJSONRenderer().render
+    ingredient_list = ingredients(args.ingredients)
+    page = recipe_page(args.recipes, args.products)
+    fragment = JSONFragment(fast(ingredient_list))
+    cases = (
+        ('ингредиенты', drf, ingredient_list, fast, ingredient_list),
+        ('рецепты', drf, page, fast, page),
+        ('ингредиенты из фрагмента', drf, ingredient_list, fast, fragment),
+    )
+    print(f'orjson: {"есть" if orjson else "нет, используется json"}')
+    print(f'{"ответ":<26}{"рендерер":<10}{"КБ":>8}{"мкс/ответ":>12}'
+          f'{"МБ/с":>9}')
+    for name, base, base_data, candidate, candidate_data in cases:
+        expected, _ = measure(base, base_data, 1)
+        for label, render, data in (
+            ('DRF', base, base_data), ('fast', candidate, candidate_data)
+        ):
+            content, seconds = measure(render, data, args.repeat)
+            assert content == expected, 'Ответы различаются'
+            print(f'{name:<26}{label:<10}{len(content) / 1024:>8.1f}'
+                  f'{seconds * 1e6:>12.1f}'
+                  f'{len(content) / seconds / 2 ** 20:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
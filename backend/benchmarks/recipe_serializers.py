@@ -0,0 +1,113 @@
+"""Сравнение RecipeSerializer и FastRecipeSerializer на странице рецептов.
+
+Во временной транзакции создает страницу рецептов с заданным числом
+продуктов и тегов, загружает ее так же, как RecipeViewSet, и замеряет
+время сериализации страницы обоими способами. Перед замерами проверяет,
+что JSON совпадает побайтно. После замеров транзакция откатывается.
+
+    python benchmarks/recipe_serializers.py --recipes 10 --products 15
+"""
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+import django
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+
+from api.fast_serializers import FastRecipeSerializer  # noqa: E402
+from api.serializers import RecipeSerializer  # noqa: E402
+from api.views import RecipeViewSet  # noqa: E402
+from recipes.models import (  # noqa: E402
+    Ingredient, Product, Recipe, Subscription, Tag, User
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_page(recipes, products, tags):
+    author = User.objects.create(
+        username='bench_author', email='bench_author@example.com',
+        first_name='Автор', last_name='Замеров'
+    )
+    reader = User.objects.create(
+        username='bench_reader', email='bench_reader@example.com',
+        first_name='Читатель', last_name='Замеров'
+    )
+    Subscription.objects.create(user=reader, author=author)
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'продукт {number}', measurement_unit='г')
+        for number in range(products)
+    )
+    tag_objects = Tag.objects.bulk_create(
+        Tag(name=f'тег {number}', slug=f'bench-tag-{number}')
+        for number in range(tags)
+    )
+    for number in range(recipes):
+        recipe = Recipe.objects.create(
+            name=f'Рецепт {number}', text='Описание ' * 50, cooking_time=30,
+            image='recipes/images/bench.png', author=author
+        )
+        recipe.tags.set(tag_objects)
+        Product.objects.bulk_create(
+            Product(recipe=recipe, ingredient=ingredient, amount=100)
+            for ingredient in ingredients
+        )
+    return author, reader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--recipes', type=int, default=10)
+    parser.add_argument('--products', type=int, default=15)
+    parser.add_argument('--tags', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic():
+            author, reader = create_page(
+                args.recipes, args.products, args.tags)
+            request = Request(RequestFactory().get('/api/recipes/'))
+            request.user = reader
+            view = RecipeViewSet(request=request, action='list')
+            page = list(view.get_queryset().filter(author=author))
+            context = {'request': request}
+
+            def drf():
+                return RecipeSerializer(page, many=True, context=context).data
+
+            def fast():
+                return FastRecipeSerializer(
+                    page, many=True, context=context).data
+
+            render = JSONRenderer().render
+            assert render(drf()) == render(fast()), 'Ответы различаются'
+            print(f'{args.recipes} рецептов по {args.products} продуктов, '
+                  f'{args.tags} тега, {args.repeat} повторов')
+            results = {}
+            for name, serialize in (('DRF', drf), ('fast', fast)):
+                seconds = min(timeit.repeat(
+                    serialize, number=args.repeat, repeat=3))
+                results[name] = seconds / args.repeat * 1000
+                print(f'{name:<6}{results[name]:>10.3f} мс на страницу')
+            print(f'ускорение в {results["DRF"] / results["fast"]:.1f} раза')
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
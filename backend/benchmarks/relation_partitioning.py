@@ -0,0 +1,168 @@
+"""Избранное в обычной и в секционированной по user_id таблице.
+
+Только PostgreSQL (DJANGO_DEBUG=False и настройки БД из окружения). В
+схеме bench_partitioning создаются две таблицы в формате
+recipes_favoriterecipe с одинаковыми строками: обычная и поделённая
+recipes.partitioning.rebuild_table на --partitions хэш-секций. Затем
+замеряются задержки запросов, которые делает API: проверка пары
+(пользователь, рецепт), все рецепты пользователя, вставка и удаление
+одной строки. Загрузка 100 млн строк занимает десятки минут, с --keep
+таблицы остаются и переиспользуются следующим запуском.
+
+    python benchmarks/relation_partitioning.py --rows 100000000 --keep
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import django
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from recipes.partitioning import rebuild_table  # noqa: E402
+
+SCHEMA = 'bench_partitioning'
+CHUNK = 5_000_000
+
+
+def table_exists(cursor, table):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [table])
+    return cursor.fetchone()[0]
+
+
+def create_table(cursor, table, partitions, rows, users):
+    """Таблица без индексов, строки, затем ограничения как у Django."""
+    cursor.execute(
+        f'CREATE TABLE {table} (id bigserial NOT NULL, '
+        'created timestamptz NOT NULL, recipe_id bigint NOT NULL, '
+        'user_id bigint NOT NULL)')
+    if partitions:
+        rebuild_table(connection, table, partitions)
+    started = time.perf_counter()
+    # Пары (пользователь, рецепт) уникальны: у каждого rows // users
+    # рецептов, у соседних id разные пользователи.
+    for start in range(1, rows + 1, CHUNK):
+        cursor.execute(
+            f'INSERT INTO {table} (id, created, recipe_id, user_id) '
+            'SELECT g, now(), g / %s + 1, g %% %s + 1 '
+            'FROM generate_series(%s, %s) g',
+            [users, users, start, min(start + CHUNK - 1, rows)])
+        print(f'  {table}: {min(start + CHUNK - 1, rows):,} строк',
+              flush=True)
+    cursor.execute(
+        f"SELECT setval('{table}_id_seq', %s)", [rows])
+    primary_key = 'id, user_id' if partitions else 'id'
+    cursor.execute(
+        f'ALTER TABLE {table} ADD PRIMARY KEY ({primary_key})')
+    cursor.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {table}_unique_user_recipe '
+        'UNIQUE (user_id, recipe_id)')
+    cursor.execute(f'CREATE INDEX {table}_recipe_id ON {table} (recipe_id)')
+    cursor.execute(f'ANALYZE {table}')
+    print(f'  {table}: загружена за {time.perf_counter() - started:.0f} с')
+
+
+def size_mb(cursor, table):
+    # У обычной таблицы дерева секций нет, её размер считается напрямую.
+    cursor.execute(
+        'SELECT coalesce(sum(pg_total_relation_size(relid)), '
+        'pg_total_relation_size(%s::regclass)) '
+        'FROM pg_partition_tree(%s::regclass)', [table, table])
+    return cursor.fetchone()[0] / 2 ** 20
+
+
+def timed(cursor, sql, params_list):
+    latencies = []
+    for params in params_list:
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        if cursor.description:
+            cursor.fetchall()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def describe(name, latencies):
+    latencies.sort()
+    p95, p99 = (
+        latencies[int(len(latencies) * share) - 1] for share in (0.95, 0.99)
+    )
+    print(f'  {name:<22} среднее {statistics.mean(latencies):7.3f} мс  '
+          f'p50 {statistics.median(latencies):7.3f}  p95 {p95:7.3f}  '
+          f'p99 {p99:7.3f}')
+
+
+def measure(cursor, table, rows, users, queries):
+    random.seed(0)
+    recipes = rows // users
+    pairs = [
+        (random.randint(1, users), random.randint(1, recipes))
+        for _ in range(queries)
+    ]
+    lookup = (
+        f'SELECT EXISTS (SELECT 1 FROM {table} '
+        'WHERE user_id = %s AND recipe_id = %s)')
+    # Прогрев: первые запросы читают страницы индексов с диска.
+    timed(cursor, lookup, pairs[:queries // 10])
+    print(f'{table}: {size_mb(cursor, table):,.0f} МБ с индексами')
+    describe('проверка пары', timed(cursor, lookup, pairs))
+    describe('рецепты пользователя', timed(
+        cursor, f'SELECT recipe_id FROM {table} WHERE user_id = %s',
+        [(user_id,) for user_id, _ in pairs]))
+    new_pairs = [
+        (user_id, recipes + 1 + number)
+        for number, (user_id, _) in enumerate(pairs)
+    ]
+    describe('вставка', timed(
+        cursor,
+        f'INSERT INTO {table} (created, recipe_id, user_id) '
+        'VALUES (now(), %s, %s)',
+        [(recipe_id, user_id) for user_id, recipe_id in new_pairs]))
+    describe('удаление', timed(
+        cursor,
+        f'DELETE FROM {table} WHERE user_id = %s AND recipe_id = %s',
+        new_pairs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000_000)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--partitions', type=int, default=16)
+    parser.add_argument('--queries', type=int, default=10_000)
+    parser.add_argument(
+        '--keep', action='store_true',
+        help='Не удалять схему с таблицами после замеров')
+    args = parser.parse_args()
+    if connection.vendor != 'postgresql':
+        sys.exit('Нужен PostgreSQL: запустите с DJANGO_DEBUG=False')
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA}')
+        cursor.execute(f'SET search_path TO {SCHEMA}')
+        try:
+            tables = (('plain', 0), ('partitioned', args.partitions))
+            for table, partitions in tables:
+                if not table_exists(cursor, table):
+                    create_table(
+                        cursor, table, partitions, args.rows, args.users)
+            print(f'строк: {args.rows:,}, пользователей: {args.users:,}, '
+                  f'секций: {args.partitions}, запросов: {args.queries:,}')
+            for table, _ in tables:
+                measure(cursor, table, args.rows, args.users, args.queries)
+        finally:
+            if not args.keep:
+                cursor.execute(f'DROP SCHEMA {SCHEMA} CASCADE')
+            cursor.execute('RESET search_path')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Сборка списка покупок: группировка по тексту и по id ингредиента.
+
+Проверяет, что все единицы из data/ingredients.csv есть в таблице
+recipes.units. Затем во временной транзакции кладет в список покупок
+рецепты с продуктами из этого файла, часть из которых указана в других
+единицах той же величины (кг вместо г, ст. л. вместо мл), и замеряет
+прежнюю сборку (GROUP BY название и единица) и новую (GROUP BY id с
+переводом единиц). После замеров транзакция откатывается.
+
+    python benchmarks/shopping_list.py --recipes 50 --products 20
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import timeit
+from pathlib import Path
+
+import django
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+from django.utils.encoding import smart_bytes  # noqa: E402
+
+from api.utils import (  # noqa: E402
+    build_shopping_list, render_shopping_list
+)
+from recipes.models import (  # noqa: E402
+    Ingredient, Product, Recipe, ShoppingRecipe, User
+)
+from recipes.units import UNITS, normalize_unit  # noqa: E402
+
+CSV_FILE = BACKEND_DIR / 'data' / 'ingredients.csv'
+# Другая единица той же величины для части продуктов.
+OTHER_UNITS = {'г': ('кг', 0.001), 'мл': ('ст. л.', 1 / 15)}
+
+
+class Rollback(Exception):
+    pass
+
+
+def check_units(rows):
+    unknown = {unit for _, unit in rows if normalize_unit(unit) not in UNITS}
+    assert not unknown, f'Нет в таблице единиц: {unknown}'
+    print(f'единиц в {CSV_FILE.name}: {len({unit for _, unit in rows})}, '
+          'все известны')
+
+
+def create_cart(rows, recipes, products):
+    random.seed(0)
+    user = User.objects.create(
+        username='bench_buyer', email='bench_buyer@example.com',
+        first_name='Покупатель', last_name='Замеров'
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'{name} bench', measurement_unit=unit)
+        for name, unit in rows
+    )
+    # Тот же продукт ещё раз в другой единице.
+    others = {
+        ingredient.name: Ingredient(
+            name=ingredient.name,
+            measurement_unit=OTHER_UNITS[ingredient.measurement_unit][0]
+        )
+        for ingredient in ingredients
+        if ingredient.measurement_unit in OTHER_UNITS
+    }
+    Ingredient.objects.bulk_create(others.values())
+    for number in range(recipes):
+        recipe = Recipe.objects.create(
+            name=f'Рецепт {number}', text='Описание', cooking_time=30,
+            image='recipes/images/bench.png', author=user
+        )
+        chosen = random.sample(ingredients, products)
+        Product.objects.bulk_create(
+            Product(
+                recipe=recipe,
+                ingredient=(
+                    others[ingredient.name]
+                    if ingredient.name in others and number % 2
+                    else ingredient
+                ),
+                amount=random.randint(1, 500)
+            ) for ingredient in chosen
+        )
+        ShoppingRecipe.objects.create(user=user, recipe=recipe)
+    return user
+
+
+def build_by_text(user):
+    """Прежняя сборка: GROUP BY название и единица, без перевода."""
+    shopping_recipes = Recipe.objects.filter(shoppingrecipes__user=user)
+    products = (
+        Product.objects.filter(recipe__in=shopping_recipes)
+        .values('ingredient__name', 'ingredient__measurement_unit')
+        .annotate(total_amount=Sum('amount'))
+        .order_by('ingredient__name')
+    )
+    return smart_bytes(render_shopping_list(
+        (
+            (product['ingredient__name'],
+             product['ingredient__measurement_unit'],
+             product['total_amount'])
+            for product in products
+        ),
+        shopping_recipes
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--recipes', type=int, default=50)
+    parser.add_argument('--products', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with open(CSV_FILE, newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader)
+        rows = list(reader)
+    check_units(rows)
+    try:
+        with transaction.atomic():
+            user = create_cart(rows, args.recipes, args.products)
+            before = build_by_text(user).decode().count(' — ')
+            after = build_shopping_list(user).decode().count(' — ')
+            print(f'{args.recipes} рецептов по {args.products} продуктов: '
+                  f'строк было {before}, стало {after}')
+            for name, build in (
+                ('по тексту', build_by_text), ('по id', build_shopping_list)
+            ):
+                seconds = min(timeit.repeat(
+                    lambda: build(user), number=args.repeat, repeat=3))
+                print(f'{name:<10}{seconds / args.repeat * 1000:>10.2f} мс')
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -30,6 +30,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,6 +39,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
+    'api.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -58,6 +62,19 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
+ASGI_APPLICATION = 'foodgram_backend.asgi.application'
+
+# Асинхронные GET-представления рецептов, ингредиентов и коротких ссылок.
+ASGI_ENABLED = os.getenv('ASGI_ENABLED', 'False').lower() in ('true', '1', 't')
+
+# Размер пула считается на один процесс: лимит соединений PostgreSQL делится
+# между воркерами gunicorn.
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', 1))
+DB_POOL = os.getenv('DB_POOL', 'False').lower() in ('true', '1', 't')
+DB_POOL_MAX_SIZE = int(os.getenv(
+    'DB_POOL_MAX_SIZE',
+    max(1, int(os.getenv('DB_MAX_CONNECTIONS', 20)) // GUNICORN_WORKERS)
+))
 
 DATABASE_CONFIGS = {
     'sqlite': {
@@ -70,14 +87,43 @@ DATABASE_CONFIGS = {
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
-    }, 
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Пул psycopg и постоянные соединения взаимоисключающие.
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 600)),
+            },
+        } if DB_POOL else {},
+    },
 }
 
 DATABASES = {
     'default': DATABASE_CONFIGS['sqlite'] if DEBUG else DATABASE_CONFIGS['pgsql']
 }
 
+# Реплики для чтения: хосты PostgreSQL или файлы SQLite в режиме отладки.
+# Нужен REDIS_URL: закрепление клиента за основной БД хранится в кэше.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(os.getenv('DB_REPLICAS', '').split(), 1):
+    DATABASE_REPLICAS.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        **({'NAME': BASE_DIR / replica} if DEBUG else {'HOST': replica}),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Хэш-секционирование избранного, списков покупок и подписок по user_id
+# (только PostgreSQL): число секций, 0 — обычные таблицы.
+RELATION_PARTITIONS = int(os.getenv('DB_RELATION_PARTITIONS', 0))
+
+DATABASE_ROUTERS = ['api.db_routers.ReplicaRouter']
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -110,6 +156,23 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media'
 
+# Результаты фоновых задач (списки покупок) лежат вне MEDIA_ROOT: nginx
+# их не раздаёт, файл отдаёт только /api/jobs/{id}/download/ владельцу.
+JOB_RESULTS_ROOT = os.getenv('JOB_RESULTS_ROOT', '/job_results')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'job_results': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': JOB_RESULTS_ROOT},
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'recipes.Member'
@@ -124,15 +187,115 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'api.parsers.MultiPartJSONParser',
+    ],
+
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    # Адрес клиента берётся из X-Forwarded-For. В продакшене перед
+    # бэкендом два прокси: HTTPS-прокси хоста и nginx контейнера. Если
+    # nginx принимает клиентов напрямую, задайте NUM_PROXIES=1.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 2)),
+
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageNumberLimitPagination',
     'PAGE_SIZE': 10,
 
 }
 
+# Загруженные файлы крупнее порога (байт) пишутся во временный файл
+# по частям, а не держатся в памяти воркера.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv(
+    'FILE_UPLOAD_MAX_MEMORY_SIZE', 256 * 1024))
+
+# Частоты запросов к тяжёлым действиям по областям, 'N/период' (s, min,
+# hour, day): корзина на N токенов наполняется за период, у каждого
+# пользователя своя, у анонимов — у каждого IP.
+THROTTLE_RATES = {
+    'shopping_cart': os.getenv('THROTTLE_SHOPPING_CART', '10/min'),
+    'short_link': os.getenv('THROTTLE_SHORT_LINK', '30/min'),
+    'ingredient_search': os.getenv('THROTTLE_INGREDIENT_SEARCH', '120/min'),
+}
+
+# Токены кэшируются в памяти процесса. Отзыв токена или отключение
+# пользователя воркеры видят через общий кэш (REDIS_URL), без него —
+# не позже чем через TTL секунд.
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 1024))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 60))
+
+# CompressionMiddleware сжимает только ответы /api/, ответы короче
+# порога (байт) не сжимаются.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+
+# Закодированные списки тегов и ингредиентов хранятся в кэше не дольше.
+REFERENCE_CACHE_TTL = int(os.getenv('REFERENCE_CACHE_TTL', 300))
+# Карточка рецепта для анонимов и адреса коротких ссылок (секунды).
+RECIPE_CACHE_TTL = int(os.getenv('RECIPE_CACHE_TTL', 30))
+SHORT_LINK_CACHE_TTL = int(os.getenv('SHORT_LINK_CACHE_TTL', 24 * 60 * 60))
+# Промах кэша считает один воркер, взявший блокировку; остальные ждут его
+# значение. Блокировка упавшего воркера снимается через столько секунд.
+CACHE_LOCK_TIMEOUT = int(os.getenv('CACHE_LOCK_TIMEOUT', 10))
+
+# Общий для воркеров кэш. Без REDIS_URL у каждого процесса свой кэш в
+# памяти: блокировки промахов и сброс записей действуют только в нём.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Индекс составов рецептов для подбора по продуктам перестраивается
+# целиком в фоновом потоке не чаще указанного интервала.
+PANTRY_INDEX_TTL = int(os.getenv('PANTRY_INDEX_TTL', 300))
+
+# Поисковый индекс в памяти (без PostgreSQL) перестраивается так же.
+SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', 300))
+
+# Авторам с большим числом подписчиков рецепты не рассылаются по лентам
+# при публикации, а подмешиваются при чтении ленты.
+FEED_FAN_OUT_LIMIT = int(os.getenv('FEED_FAN_OUT_LIMIT', 10000))
+FEED_BACKFILL = int(os.getenv('FEED_BACKFILL', 100))
+
+# Журнал событий рецептов пишется пакетами.
+EVENTS_FLUSH_SIZE = int(os.getenv('EVENTS_FLUSH_SIZE', 100))
+EVENTS_FLUSH_INTERVAL = int(os.getenv('EVENTS_FLUSH_INTERVAL', 5))
+
+# Фоновые задачи (run_worker): задача, не завершённая за таймаут
+# видимости (секунды), снова выдаётся воркерам.
+JOB_VISIBILITY_TIMEOUT = int(os.getenv('JOB_VISIBILITY_TIMEOUT', 300))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1))
+# Завершённые задачи и файлы упавших попыток удаляет purge_jobs, когда
+# им больше указанного числа секунд.
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 24 * 60 * 60))
+# Список покупок с большим числом рецептов собирается фоновой задачей.
+SHOPPING_LIST_SYNC_LIMIT = int(os.getenv('SHOPPING_LIST_SYNC_LIMIT', 50))
+# Удалённые рецепты и пользователи стираются пачками такого размера.
+PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', 500))
+
+# Доля запросов, чьи SQL и тайминги попадают в /api/diagnostics/profile/.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.01))
+PROFILING_BUFFER_SIZE = int(os.getenv('PROFILING_BUFFER_SIZE', 1000))
+# Запросы к БД дольше порога (мс) пишутся в журнал api.slow_queries.
+PROFILING_SLOW_QUERY_MS = int(os.getenv('PROFILING_SLOW_QUERY_MS', 500))
+
+# Метрики /metrics; под gunicorn каталог PROMETHEUS_MULTIPROC_DIR
+# задается в gunicorn.conf.py.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 't')
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'api.serializers.MemberSerializer',
@@ -4,12 +4,15 @@ from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
 
+from api.views import metrics
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api-auth/', include('rest_framework.urls')),
     path('api/', include('api.urls')),
     path('s/', include('recipes.urls')),
+    path('metrics', metrics, name='metrics'),
     path('recipes/<int:pk>/',
          TemplateView.as_view(
              template_name='empty.html'), name='frontend-recipe-detail'),
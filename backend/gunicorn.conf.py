@@ -0,0 +1,27 @@
+import os
+import shutil
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8001')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+
+if os.getenv('ASGI_ENABLED', 'False').lower() in ('true', '1', 't'):
+    wsgi_app = 'foodgram_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram_backend.wsgi:application'
+
+# Общий каталог метрик Prometheus для всех воркеров.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/foodgram-metrics'
+)
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
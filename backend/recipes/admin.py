@@ -1,17 +1,33 @@
+from django import forms
 from django.contrib import admin
-from django.contrib.admin import RelatedOnlyFieldListFilter
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group
-from django.db.models import Count, Prefetch
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import (
+    Count, IntegerField, OuterRef, Prefetch, Q, Subquery, Value
+)
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
+from django.utils.translation import gettext_lazy as _
 
-from .constants import LONG_COOKING, MEDIUM_COOKING, QUICK_COOKING
+from .constants import (
+    ADMIN_COUNTS_CACHE_TIMEOUT, ADMIN_ESTIMATED_COUNT_THRESHOLD, LONG_COOKING,
+    MEDIUM_COOKING, QUICK_COOKING
+)
 from .models import (
-    FavoriteRecipe, Ingredient, Product, Recipe,
-    RecipeShortLink, ShoppingRecipe, Subscription, Tag, User
+    FavoriteRecipe, Ingredient, Job, Product, Recipe, RecipeShortLink,
+    RecipeStatsDaily, RecipeStatsHourly, ShoppingRecipe, Subscription, Tag,
+    User
 )
-from .mixins import RecipesCountMixin
+from .deletion import soft_delete_recipes, soft_delete_user
+from .mixins import RecipesCountMixin, SoftDeleteAdminMixin
+from .search import search_recipes
 
 
 admin.site.empty_value_display = 'Не задано'
@@ -50,13 +66,13 @@ class SubscribersCountFilter(HasRecordsFilter):
 
 
 @admin.register(User)
-class MemberAdmin(UserAdmin):
+class MemberAdmin(SoftDeleteAdminMixin, UserAdmin):
     list_display = (
         'username', 'email', 'first_name', 'last_name', 'avatar_tag',
         'recipes_count', 'subscriptions_count', 'subscribers_count'
     )
     list_filter = (
-        'is_staff', RecipesCountFilter, SubscriptionsCountFilter,
+        'is_staff', 'is_active', RecipesCountFilter, SubscriptionsCountFilter,
         SubscribersCountFilter
     )
     readonly_fields = ('avatar_preview', )
@@ -69,12 +85,17 @@ class MemberAdmin(UserAdmin):
     def get_queryset(self, request):
         users = super().get_queryset(request)
         users = users.annotate(
-            recipes_count=Count('recipes', distinct=True),
+            recipes_count=Count('recipes', distinct=True, filter=Q(
+                recipes__deleted_at__isnull=True)),
             subscriptions_count=Count('subscriptions', distinct=True),
             subscribers_count=Count('subscribed_to', distinct=True)
         )
         return users
 
+    def soft_delete(self, queryset):
+        for user in queryset:
+            soft_delete_user(user)
+
     @mark_safe
     @admin.display(description='Превью')
     def avatar_preview(self, user):
@@ -133,11 +154,134 @@ class MemberAdmin(UserAdmin):
 class ProductInline(admin.TabularInline):
     model = Product
     extra = 1
+    autocomplete_fields = ('ingredient',)
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """Фильтр по связанному объекту с поиском через autocomplete.
+
+    В отличие от RelatedOnlyFieldListFilter не перебирает связанные
+    объекты: варианты подгружаются по мере ввода.
+    """
+
+    template = 'admin/autocomplete_filter.html'
+    field_name = ''
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = f'{self.field_name}__id__exact'
+        super().__init__(request, params, model, model_admin)
+        field = model._meta.get_field(self.field_name)
+        self.widget = forms.ModelChoiceField(
+            queryset=field.related_model.objects.all(),
+            widget=AutocompleteSelect(
+                field, model_admin.admin_site,
+                attrs={'data-placeholder': self.title}
+            )
+        ).widget.render(self.parameter_name, self.value())
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name]),
+            'display': _('All'),
+        }
+
+
+class AuthorFilter(AutocompleteFilter):
+    title = 'Автор'
+    field_name = 'author'
+
+
+class TagFilter(AutocompleteFilter):
+    title = 'Тег'
+    field_name = 'tags'
+
+
+class IngredientFilter(AutocompleteFilter):
+    title = 'Ингредиент'
+    field_name = 'ingredients'
+
+
+class ProductIngredientFilter(AutocompleteFilter):
+    title = 'Ингредиент'
+    field_name = 'ingredient'
+
+
+class RecipeFilter(AutocompleteFilter):
+    title = 'Рецепт'
+    field_name = 'recipe'
+
+
+class UserFilter(AutocompleteFilter):
+    title = 'Пользователь'
+    field_name = 'user'
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает строки больших таблиц целиком.
+
+    Для выборки без фильтров на PostgreSQL берет оценку из статистики
+    планировщика, если таблица больше ADMIN_ESTIMATED_COUNT_THRESHOLD.
+    Фильтр менеджера по умолчанию (скрытие удалённых рецептов) не
+    считается: помеченных строк мало, и оценка остаётся оценкой.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        unfiltered = not queryset.query.where or (
+            queryset.query.where
+            == queryset.model._default_manager.all().query.where
+        )
+        if connection.vendor == 'postgresql' and unfiltered:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Админка для таблиц, которые могут вырасти до миллионов строк."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ()
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(
+            Recipe._meta.get_field('author'), self.admin_site
+        ).media + forms.Media(js=('admin/js/autocomplete_filter.js',))
+
+    def get_queryset(self, request):
+        # __str__ связанных объектов нужен и в форме, и в журнале действий.
+        return super().get_queryset(request).select_related(
+            *self.list_select_related
+        )
 
 
 class CookingTimeFilter(admin.SimpleListFilter):
     title = 'Время готовки (мин)'
     parameter_name = 'cooking_time'
+    counts_cache_key = 'admin-cooking-time-counts'
     COOKING_TIME_FILTERS = {
         f'До {MEDIUM_COOKING[0]}': QUICK_COOKING,
         f'{MEDIUM_COOKING[0]} - {MEDIUM_COOKING[1]}': MEDIUM_COOKING,
@@ -149,12 +293,21 @@ class CookingTimeFilter(admin.SimpleListFilter):
         return recipes.filter(cooking_time__range=range_values)
 
     def lookups(self, request, model_admin):
-        recipes = model_admin.get_queryset(request)
-        lookups = []
-        for key, range_values in self.COOKING_TIME_FILTERS.items():
-            count = self.filter_recipes(recipes, range_values).count()
-            lookups.append((key, f'{key} ({count})'))
-        return lookups
+        counts = cache.get(self.counts_cache_key)
+        if counts is None:
+            # Один запрос с условной агрегацией вместо count() на диапазон.
+            counts = Recipe.objects.aggregate(**{
+                f'range_{number}': Count(
+                    'pk', filter=Q(cooking_time__range=range_values))
+                for number, range_values in enumerate(
+                    self.COOKING_TIME_FILTERS.values())
+            })
+            cache.set(
+                self.counts_cache_key, counts, ADMIN_COUNTS_CACHE_TIMEOUT)
+        return [
+            (key, f'{key} ({counts[f"range_{number}"]})')
+            for number, key in enumerate(self.COOKING_TIME_FILTERS)
+        ]
 
     def queryset(self, request, queryset):
         filter_value = self.COOKING_TIME_FILTERS.get(self.value())
@@ -164,7 +317,7 @@ class CookingTimeFilter(admin.SimpleListFilter):
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(SoftDeleteAdminMixin, LargeTableAdmin):
     list_display = (
         'id', 'name', 'image_tag', 'author', 'pub_date_short',
         'cooking_time', 'tags_pile', 'products_pile',
@@ -179,16 +332,28 @@ class RecipeAdmin(admin.ModelAdmin):
             )
         }),
     )
-    search_fields = ('name', 'author',)
+    search_fields = ('name',)
     list_filter = (
-        CookingTimeFilter,
-        ('tags', RelatedOnlyFieldListFilter),
-        ('author', RelatedOnlyFieldListFilter),
-        ('ingredients', RelatedOnlyFieldListFilter),
+        CookingTimeFilter, TagFilter, AuthorFilter, IngredientFilter
     )
     list_display_links = ('id',)
+    list_select_related = ('author',)
+    autocomplete_fields = ('author', 'tags')
     inlines = (ProductInline,)
 
+    def soft_delete(self, queryset):
+        soft_delete_recipes(queryset)
+
+    @staticmethod
+    def count_related(model):
+        # Коррелированный подзапрос считается только для строк страницы,
+        # а не агрегирует весь JOIN с избранным и списками покупок.
+        return Coalesce(Subquery(
+            model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+                'recipe').annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField()
+        ), Value(0))
+
     def get_queryset(self, request):
         recipes = super().get_queryset(request)
         recipes = recipes.prefetch_related(
@@ -198,11 +363,16 @@ class RecipeAdmin(admin.ModelAdmin):
                 queryset=Product.objects.select_related('ingredient')
             )
         ).annotate(
-            favorites_count=Count('favoriterecipes', distinct=True),
-            shopping_count=Count('shoppingrecipes', distinct=True)
+            favorites_count=self.count_related(FavoriteRecipe),
+            shopping_count=self.count_related(ShoppingRecipe)
         )
         return recipes
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_recipes(queryset, search_term), False
+
     @admin.display(description='Дата')
     def pub_date_short(self, obj):
         return obj.pub_date.strftime('%d.%m.%y')
@@ -267,6 +437,8 @@ class RecipeAdmin(admin.ModelAdmin):
 @admin.register(Tag)
 class TagAdmin(RecipesCountMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'slug', 'recipes_count')
+    search_fields = ('name', 'slug')
+    ordering = ('name',)
     list_display_links = ('id',)
     list_filter = (RecipesCountFilter, )
     annotate_field = 'recipes'
@@ -278,6 +450,7 @@ class TagAdmin(RecipesCountMixin, admin.ModelAdmin):
 class IngredientAdmin(RecipesCountMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit', 'recipes_count')
     search_fields = ('name',)
+    ordering = ('name',)
     list_filter = (RecipesCountFilter, 'measurement_unit')
     list_display_links = ('id',)
     annotate_field = 'products__recipe'
@@ -286,36 +459,36 @@ class IngredientAdmin(RecipesCountMixin, admin.ModelAdmin):
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'author')
     search_fields = ('user__username', 'author__username')
     list_display_links = ('id',)
     fields = ('user', 'author')
-    list_filter = (
-        ('user', RelatedOnlyFieldListFilter),
-        ('author', RelatedOnlyFieldListFilter),
-    )
+    list_filter = (UserFilter, AuthorFilter)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    ordering = ('-id',)
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(LargeTableAdmin):
     list_display = ('id', 'recipe', 'ingredient', 'amount')
-    search_fields = ('recipe', 'ingredient')
+    search_fields = ('recipe__name', 'ingredient__name')
     list_display_links = ('id',)
-    list_filter = (
-        'recipe',
-        ('ingredient', RelatedOnlyFieldListFilter),
-    )
+    list_filter = (RecipeFilter, ProductIngredientFilter)
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+    ordering = ('-id',)
 
 
-class MemberRecipeAdmin(admin.ModelAdmin):
+class MemberRecipeAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'recipe',)
-    search_fields = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
     list_display_links = ('id',)
-    list_filter = (
-        ('user', RelatedOnlyFieldListFilter),
-        ('recipe', RelatedOnlyFieldListFilter),
-    )
+    list_filter = (UserFilter, RecipeFilter)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    ordering = ('-id',)
 
 
 @admin.register(ShoppingRecipe)
@@ -331,5 +504,61 @@ class FavoriteRecipeAdmin(MemberRecipeAdmin):
 @admin.register(RecipeShortLink)
 class RecipeShortLinkAdmin(admin.ModelAdmin):
     list_display = ('id', 'recipe', 'short_code',)
-    search_fields = ('recipe',)
+    search_fields = ('recipe__name', 'short_code')
     list_display_links = ('id',)
+    list_select_related = ('recipe',)
+    autocomplete_fields = ('recipe',)
+
+
+class RecipeStatsAdmin(admin.ModelAdmin):
+    """Аналитика по рецептам, читает только готовые агрегаты."""
+
+    list_display = (
+        'start', 'recipe', 'views', 'favorites_added', 'favorites_removed',
+        'carts_added', 'carts_removed'
+    )
+    list_select_related = ('recipe',)
+    date_hierarchy = 'start'
+    search_fields = ('recipe__name',)
+    ordering = ('-start', '-views')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RecipeStatsHourly)
+class RecipeStatsHourlyAdmin(RecipeStatsAdmin):
+    pass
+
+
+@admin.register(RecipeStatsDaily)
+class RecipeStatsDailyAdmin(RecipeStatsAdmin):
+    pass
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Фоновые задачи; упавшие можно перезапустить действием."""
+
+    list_display = (
+        'id', 'name', 'status', 'attempts', 'user', 'created', 'finished'
+    )
+    list_filter = ('status', 'name')
+    list_select_related = ('user',)
+    readonly_fields = (
+        'attempts', 'result', 'result_file', 'error', 'created', 'finished'
+    )
+    actions = ('retry',)
+    ordering = ('-id',)
+
+    @admin.action(description='Перезапустить')
+    def retry(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(),
+            finished=None
+        )
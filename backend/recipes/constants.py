@@ -9,3 +9,10 @@ MIN_COOKING_TIME = 1
 QUICK_COOKING = (1, 14)
 MEDIUM_COOKING = (15, 40)
 LONG_COOKING = (41, 10**10)
+SIMILAR_RECIPES_TOP_K = 10
+TAG_SIMILARITY_WEIGHT = 0.5
+POPULARITY_FAVORITE_WEIGHT = 1
+POPULARITY_SHOPPING_WEIGHT = 2
+TRENDING_HALF_LIFE_DAYS = 7
+ADMIN_COUNTS_CACHE_TIMEOUT = 60
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CASCADE, Exists, OuterRef
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Recipe, User
+
+# Рецепты помечены удалёнными; аргумент recipe_ids — их id. Замена
+# post_delete для индексов и кэшей, пока рецепты не стёрты.
+recipes_soft_deleted = Signal()
+
+
+def soft_delete_recipes(recipes):
+    """Помечает рецепты удалёнными одним UPDATE вместо каскада."""
+    recipe_ids = list(recipes.values_list('pk', flat=True))
+    if recipe_ids:
+        recipes.update(deleted_at=timezone.now())
+        recipes_soft_deleted.send(sender=Recipe, recipe_ids=recipe_ids)
+    return len(recipe_ids)
+
+
+def soft_delete_user(user):
+    """Отключает пользователя и помечает удалёнными его рецепты.
+
+    Пользователь остаётся в таблице до purge_deleted: его почта и имя
+    заняты, войти он уже не может.
+    """
+    with transaction.atomic():
+        user.is_active = False
+        user.deleted_at = timezone.now()
+        user.save(update_fields=['is_active', 'deleted_at'])
+        soft_delete_recipes(Recipe.objects.filter(author=user))
+
+
+def delete_dependents(model, pks):
+    """Стирает строки, ссылающиеся на pks, без сигналов post_delete.
+
+    Обработчики избранного и продуктов пересчитали бы популярность и
+    записали события по стираемым рецептам, а сами сигналы выключают
+    быстрое удаление Django: каждая строка читалась бы отдельно. Модели
+    со своими зависимыми записями удаляются обычным каскадом.
+    """
+    for relation in model._meta.related_objects:
+        if getattr(relation, 'on_delete', None) is not CASCADE:
+            continue
+        rows = relation.related_model._base_manager.filter(
+            **{f'{relation.field.name}__in': pks})
+        if relation.related_model._meta.related_objects:
+            rows.delete()
+        else:
+            rows._raw_delete(rows.db)
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if through._meta.auto_created:
+            rows = through._base_manager.filter(
+                **{f'{field.m2m_field_name()}__in': pks})
+            rows._raw_delete(rows.db)
+
+
+def delete_in_batches(queryset, batch_size):
+    """Удаляет записи queryset пачками, каждую в своей транзакции.
+
+    Число запросов на пачку не зависит от числа связанных строк.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            delete_dependents(queryset.model, pks)
+            queryset.model._base_manager.filter(pk__in=pks).delete()
+        deleted += len(pks)
+
+
+def purge_deleted(batch_size=None):
+    """Окончательно удаляет помеченные рецепты и пользователей.
+
+    Каскад одной пачки ограничен batch_size рецептами, поэтому очистка
+    не держит долгих блокировок. Пользователь стирается после всех
+    своих рецептов. Счётчики популярности рецептов, которые удалённый
+    пользователь добавлял в избранное, сверяет recompute_popularity.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    return {
+        'recipes': delete_in_batches(
+            Recipe.all_objects.filter(deleted_at__isnull=False), batch_size
+        ),
+        'users': delete_in_batches(
+            User.objects.filter(deleted_at__isnull=False).exclude(
+                Exists(Recipe.all_objects.filter(author=OuterRef('pk')))
+            ), batch_size
+        ),
+    }
@@ -0,0 +1,132 @@
+import atexit
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import (
+    EventRollupState, Recipe, RecipeEvent, RecipeStatsDaily,
+    RecipeStatsHourly
+)
+
+
+# События моложе этого интервала не агрегируются: транзакции с меньшими id
+# могут ещё не быть зафиксированы.
+ROLLUP_LAG = timedelta(minutes=1)
+BATCH_SIZE = 5000
+
+
+class EventBuffer:
+    """Копит события в памяти и записывает их пакетами.
+
+    Сброс происходит при накоплении EVENTS_FLUSH_SIZE событий, фоновым
+    потоком раз в EVENTS_FLUSH_INTERVAL секунд и при завершении процесса.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def add(self, event):
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= settings.EVENTS_FLUSH_SIZE
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_periodically, daemon=True)
+                self._flusher.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            events, self._events = self._events, []
+        if events:
+            RecipeEvent.objects.bulk_create(events, batch_size=BATCH_SIZE)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(settings.EVENTS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+buffer = EventBuffer()
+atexit.register(buffer.flush)
+
+
+def record_event(kind, recipe_id, user=None):
+    buffer.add(RecipeEvent(
+        kind=kind, recipe_id=recipe_id,
+        user_id=user.pk if user and user.is_authenticated else None
+    ))
+
+
+def merge_counts(model, counts):
+    """Прибавляет счётчики {(recipe_id, start): {поле: n}} к агрегатам."""
+    existing = {}
+    starts = {start for _, start in counts}
+    for stats in model.objects.filter(
+        start__in=starts, recipe_id__in={recipe_id for recipe_id, _ in counts}
+    ):
+        if (stats.recipe_id, stats.start) in counts:
+            existing[stats.recipe_id, stats.start] = stats
+    created = []
+    for key, fields in counts.items():
+        stats = existing.get(key)
+        if stats is None:
+            created.append(model(recipe_id=key[0], start=key[1], **fields))
+            continue
+        for field, count in fields.items():
+            setattr(stats, field, getattr(stats, field) + count)
+    model.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    model.objects.bulk_update(
+        existing.values(), model.COUNTERS.values(), batch_size=BATCH_SIZE)
+
+
+@transaction.atomic
+def rollup_events():
+    """Добавляет в агрегаты события после последнего учтённого.
+
+    События удалённых рецептов пропускаются. Возвращает число учтённых
+    событий.
+    """
+    state = EventRollupState.objects.select_for_update().first()
+    if state is None:
+        state = EventRollupState.objects.create()
+    events = RecipeEvent.objects.filter(
+        pk__gt=state.last_event_id,
+        created__lt=timezone.now() - ROLLUP_LAG
+    )
+    last_event_id = events.order_by('-pk').values_list(
+        'pk', flat=True).first()
+    if last_event_id is None:
+        return 0
+    events = events.filter(pk__lte=last_event_id)
+    processed = 0
+    for model, trunc in (
+        (RecipeStatsHourly, TruncHour), (RecipeStatsDaily, TruncDay)
+    ):
+        counts = defaultdict(dict)
+        for row in events.filter(
+            Exists(Recipe.objects.filter(pk=OuterRef('recipe_id')))
+        ).annotate(start=trunc('created')).values(
+            'recipe_id', 'start', 'kind'
+        ).annotate(count=Count('pk')).order_by():
+            field = model.COUNTERS[row['kind']]
+            counts[row['recipe_id'], row['start']][field] = row['count']
+            if model is RecipeStatsHourly:
+                processed += row['count']
+        merge_counts(model, counts)
+    state.last_event_id = last_event_id
+    state.save()
+    return processed
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .models import FeedEntry, Recipe, Subscription, User
+
+
+def fan_out(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора.
+
+    Если подписчиков больше FEED_FAN_OUT_LIMIT, автор переводится
+    в режим чтения: его рецепты подмешиваются в ленту при запросе.
+    """
+    author = recipe.author
+    if author.feed_fan_out_on_read:
+        return
+    subscribers = list(Subscription.objects.filter(
+        author=author
+    ).values_list('user_id', flat=True)[:settings.FEED_FAN_OUT_LIMIT + 1])
+    if len(subscribers) > settings.FEED_FAN_OUT_LIMIT:
+        User.objects.filter(pk=author.pk).update(feed_fan_out_on_read=True)
+        return
+    FeedEntry.objects.bulk_create((
+        FeedEntry(
+            user_id=user_id, recipe=recipe, author=author,
+            pub_date=recipe.pub_date
+        ) for user_id in subscribers
+    ), ignore_conflicts=True)
+
+
+def backfill(user, author):
+    """Заполняет ленту нового подписчика последними рецептами автора."""
+    if author.feed_fan_out_on_read:
+        return
+    FeedEntry.objects.bulk_create((
+        FeedEntry(
+            user=user, recipe_id=recipe_id, author=author, pub_date=pub_date
+        ) for recipe_id, pub_date in Recipe.objects.filter(
+            author=author
+        ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL]
+    ), ignore_conflicts=True)
+
+
+def remove_author(user, author):
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+def remove_recipes(recipe_ids):
+    """Убирает удалённые рецепты из лент, не дожидаясь purge_deleted.
+
+    Иначе read_feed отдавал бы их позиции, а страница без самих
+    рецептов выходила бы короче limit.
+    """
+    FeedEntry.objects.filter(recipe_id__in=recipe_ids).delete()
+
+
+def before(cursor, id_field):
+    """Условие keyset-пагинации: строго раньше позиции (дата, id)."""
+    if cursor is None:
+        return Q()
+    pub_date, recipe_id = cursor
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'{id_field}__lt': recipe_id})
+
+
+def read_feed(user, cursor, limit):
+    """Позиции (дата, id рецепта) страницы ленты после cursor.
+
+    Лента читается одним диапазонным сканом по индексу записей, рецепты
+    авторов с fan-out при чтении добавляются отдельным запросом.
+    """
+    page = set(FeedEntry.objects.filter(
+        before(cursor, 'recipe_id'), user=user
+    ).values_list('pub_date', 'recipe_id')[:limit])
+    pulled_authors = Subscription.objects.filter(
+        user=user, author__feed_fan_out_on_read=True
+    ).values('author')
+    page.update(Recipe.objects.filter(
+        before(cursor, 'pk'), author__in=pulled_authors
+    ).order_by('-pub_date', '-pk').values_list('pub_date', 'pk')[:limit])
+    return sorted(page, reverse=True)[:limit]
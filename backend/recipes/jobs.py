@@ -0,0 +1,139 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Повторная попытка откладывается на RETRY_DELAY, удваиваясь с каждой
+# неудачей: 30 секунд, минута, две...
+RETRY_DELAY = timedelta(seconds=30)
+
+TASKS = {}
+
+
+def task(name=None, max_attempts=3):
+    """Регистрирует функцию как задачу очереди.
+
+    Функция вызывается как func(job, **job.payload) в процессе воркера,
+    её результат (JSON) сохраняется в job.result. Задача может быть
+    выполнена повторно: после ошибки или если воркер не уложился в
+    таймаут видимости, поэтому она должна быть идемпотентной.
+    Задачи объявляются в модулях tasks.py приложений.
+    """
+    def register(func):
+        func.task_name = name or func.__name__
+        func.max_attempts = max_attempts
+        TASKS[func.task_name] = func
+        return func
+    return register
+
+
+def get_task(name):
+    if name not in TASKS:
+        autodiscover_modules('tasks')
+    return TASKS[name]
+
+
+def enqueue(name, user=None, **payload):
+    """Ставит задачу в очередь и возвращает Job."""
+    return Job.objects.create(
+        name=name, user=user, payload=payload,
+        max_attempts=get_task(name).max_attempts
+    )
+
+
+def claim(limit):
+    """Забирает до limit готовых к выполнению задач.
+
+    Подходят задачи в очереди, чьё время пришло, и выполняемые с
+    истекшим таймаутом видимости: их воркер завис или умер. Задача
+    занимается условным UPDATE по числу попыток, поэтому два воркера
+    не возьмут её одновременно на любой СУБД.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status__in=(Job.QUEUED, Job.RUNNING), run_after__lte=now
+    ).values_list('pk', 'attempts', 'max_attempts')[:limit]
+    claimed = []
+    for pk, attempts, max_attempts in candidates:
+        if attempts >= max_attempts:
+            # Последняя попытка не вернулась за таймаут видимости.
+            Job.objects.filter(pk=pk, attempts=attempts).update(
+                status=Job.FAILED, finished=now,
+                error='Превышен таймаут видимости'
+            )
+            continue
+        if Job.objects.filter(pk=pk, attempts=attempts).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1,
+            run_after=now + timedelta(
+                seconds=settings.JOB_VISIBILITY_TIMEOUT)
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def run_job(pk):
+    """Выполняет занятую задачу и записывает итог."""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=pk)
+        # Запись итога не затирает более позднюю попытку другого воркера.
+        current = Job.objects.filter(pk=pk, attempts=job.attempts)
+        try:
+            result = get_task(job.name)(job, **job.payload)
+        except Exception:
+            logger.exception('Задача %s завершилась ошибкой', job)
+            error = traceback.format_exc()
+            now = timezone.now()
+            if job.attempts >= job.max_attempts:
+                current.update(status=Job.FAILED, error=error, finished=now)
+                return Job.FAILED
+            current.update(
+                status=Job.QUEUED, error=error,
+                run_after=now + RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+            return Job.QUEUED
+        current.update(
+            status=Job.DONE, result=result,
+            result_file=job.result_file.name, error='',
+            finished=timezone.now()
+        )
+        return Job.DONE
+    finally:
+        close_old_connections()
+
+
+def purge_jobs(ttl=None):
+    """Удаляет завершённые задачи старше ttl секунд и лишние файлы.
+
+    Файл без задачи остаётся от удалённой задачи или от попытки, которая
+    записала файл, но не дошла до конца. Файлы моложе ttl не трогаются:
+    их может дописывать выполняемая сейчас задача.
+    """
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.JOB_RESULT_TTL if ttl is None else ttl)
+    jobs, _ = Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED), finished__lt=cutoff
+    ).delete()
+    storage = Job._meta.get_field('result_file').storage
+    if not storage.exists(''):
+        return {'jobs': jobs, 'files': 0}
+    referenced = set(Job.objects.exclude(
+        result_file='').values_list('result_file', flat=True))
+    files = 0
+    for name in storage.listdir('')[1]:
+        if (
+            name not in referenced
+            and storage.get_modified_time(name) < cutoff
+        ):
+            storage.delete(name)
+            files += 1
+    return {'jobs': jobs, 'files': files}
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from recipes.constants import SIMILAR_RECIPES_TOP_K
+from recipes.similarity import compute_all, compute_touched, last_computed_at
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает таблицу похожих рецептов: полностью или только '
+        'для рецептов, изменённых после предыдущего запуска'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать соседей всех рецептов.')
+        parser.add_argument(
+            '--top-k', type=int, default=SIMILAR_RECIPES_TOP_K,
+            help='Сколько соседей хранить для рецепта.')
+
+    def handle(self, *args, **options):
+        since = None if options['full'] else last_computed_at()
+        if since is None:
+            count = compute_all(options['top_k'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Соседи пересчитаны для {count} рецептов'))
+            return
+        count = compute_touched(since, options['top_k'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлены соседи {count} изменённых рецептов'))
@@ -1,8 +1,7 @@
-import csv
-
 from django.core.management import BaseCommand
 
-from recipes.models import Ingredient
+from recipes.jobs import enqueue
+from recipes.tasks import load_csv
 
 
 class Command(BaseCommand):
@@ -12,19 +11,16 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Path to the CSV file.')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Поставить загрузку в очередь фоновых задач.')
 
     def handle(self, *args, **kwargs):
-        csv_file = kwargs['csv_file']
-
-        with open(csv_file, newline='', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)
-
-            for row in reader:
-                name, measurement_unit = row
-                Ingredient.objects.create(
-                    name=name,
-                    measurement_unit=measurement_unit,
-                )
+        if kwargs['background']:
+            job = enqueue('load_csv', csv_file=kwargs['csv_file'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Загрузка поставлена в очередь: задача #{job.pk}'))
+            return
+        load_csv(None, kwargs['csv_file'])
 
         self.stdout.write(self.style.SUCCESS('Данные успешно загружены'))
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes.partitioning import (
+    PARTITIONED_TABLES, list_partitions, rebuild_table, split_partitions
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Секционирует избранное, списки покупок и подписки по user_id: '
+        'создаёт и присоединяет недостающие хэш-секции'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=settings.RELATION_PARTITIONS,
+            help='Число секций, по умолчанию DB_RELATION_PARTITIONS')
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересоздать таблицы с копированием всех строк: нужно, '
+                 'чтобы уменьшить число секций или вернуть обычные '
+                 'таблицы (--partitions 0)')
+        parser.add_argument(
+            '--status', action='store_true',
+            help='Только показать текущие секции')
+
+    def handle(self, *args, partitions, rebuild, status, **kwargs):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование есть только в PostgreSQL')
+        if partitions < 0:
+            raise CommandError('Число секций не может быть отрицательным')
+        for table in PARTITIONED_TABLES:
+            with connection.cursor() as cursor:
+                current = list_partitions(cursor, table)
+            if status:
+                self.report(table, current)
+                continue
+            if current is None and not partitions:
+                continue
+            if current is None or rebuild:
+                rebuild_table(connection, table, partitions)
+                self.stdout.write(f'{table}: пересоздана, секций: '
+                                  f'{partitions or "нет"}')
+                continue
+            if not partitions:
+                raise CommandError(
+                    'Вернуть обычные таблицы можно только с --rebuild')
+            try:
+                split = split_partitions(connection, table, partitions)
+            except ValueError as exc:
+                raise CommandError(
+                    f'{exc}. Поделить секции можно только на кратное '
+                    'число, иначе нужен --rebuild')
+            self.stdout.write(f'{table}: поделено секций: {split}')
+        if not status:
+            self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def report(self, table, current):
+        if current is None:
+            self.stdout.write(f'{table}: обычная таблица')
+            return
+        moduli = sorted({modulus for _, modulus, _ in current})
+        self.stdout.write(
+            f'{table}: секций {len(current)}, модули {moduli}')
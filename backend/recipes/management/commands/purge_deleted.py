@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.deletion import purge_deleted
+from recipes.jobs import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет помеченные удалёнными рецепты и '
+        'пользователей вместе со связанными записями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.PURGE_BATCH_SIZE,
+            help='Рецептов или пользователей в одной транзакции')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Поставить очистку в очередь фоновых задач')
+
+    def handle(self, *args, batch_size, background, **kwargs):
+        if background:
+            job = enqueue('purge_deleted', batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(
+                f'Очистка поставлена в очередь: задача #{job.pk}'))
+            return
+        purged = purge_deleted(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено рецептов: {purged["recipes"]}, '
+            f'пользователей: {purged["users"]}'))
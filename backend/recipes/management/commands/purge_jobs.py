@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.jobs import purge_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет завершённые фоновые задачи и файлы результатов, '
+        'на которые не ссылается ни одна задача'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ttl', type=int, default=settings.JOB_RESULT_TTL,
+            help='Возраст в секундах, по умолчанию JOB_RESULT_TTL')
+
+    def handle(self, *args, ttl, **kwargs):
+        purged = purge_jobs(ttl)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено задач: {purged["jobs"]}, файлов: {purged["files"]}'))
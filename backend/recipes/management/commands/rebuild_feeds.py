@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import backfill
+from recipes.models import FeedEntry, Subscription
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет ленты подписчиков по текущим подпискам'
+
+    def handle(self, *args, **kwargs):
+        FeedEntry.objects.all().delete()
+        subscriptions = Subscription.objects.select_related('user', 'author')
+        for subscription in subscriptions.iterator():
+            backfill(subscription.user, subscription.author)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты заполнены по {subscriptions.count()} подпискам'))
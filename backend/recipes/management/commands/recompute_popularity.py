@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes.jobs import enqueue
+from recipes.popularity import recompute_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярность и рейтинг трендов рецептов '
+        'по избранному и спискам покупок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Поставить пересчёт в очередь фоновых задач')
+
+    def handle(self, *args, background, **kwargs):
+        if background:
+            job = enqueue('recompute_popularity')
+            self.stdout.write(self.style.SUCCESS(
+                f'Пересчёт поставлен в очередь: задача #{job.pk}'))
+            return
+        count = recompute_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинги пересчитаны, рецептов с активностью: {count}'))
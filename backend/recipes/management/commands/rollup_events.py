@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.events import buffer, rollup_events
+
+
+class Command(BaseCommand):
+    help = 'Добавляет новые события рецептов в почасовые и дневные агрегаты'
+
+    def handle(self, *args, **kwargs):
+        buffer.flush()
+        count = rollup_events()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано событий: {count}'))
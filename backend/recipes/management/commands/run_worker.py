@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from recipes.jobs import claim, run_job
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в пуле процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Число процессов пула, по умолчанию по числу ядер')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться')
+
+    def handle(self, *args, processes, once, **kwargs):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        # Процессы пула запускаются заново и сами настраивают Django:
+        # при fork они унаследовали бы соединения с БД этого процесса.
+        with ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup
+        ) as pool:
+            running = {}
+            while not self.stopping:
+                close_old_connections()
+                if len(running) < processes:
+                    running.update(
+                        (pool.submit(run_job, pk), pk)
+                        for pk in claim(processes - len(running))
+                    )
+                if not running:
+                    if once:
+                        break
+                    time.sleep(settings.JOB_POLL_INTERVAL)
+                    continue
+                done, _ = wait(
+                    running, timeout=settings.JOB_POLL_INTERVAL,
+                    return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    self.report(running.pop(future), future)
+            # Начатые задачи доделываются, новые не берутся.
+            wait(running)
+        self.stdout.write(self.style.SUCCESS('Воркер остановлен'))
+
+    def report(self, pk, future):
+        try:
+            status = future.result()
+        except BrokenProcessPool:
+            # Задачи упавшего процесса вернутся в работу по таймауту
+            # видимости, пул перезапускается вместе с командой.
+            raise CommandError('Процесс пула аварийно завершился')
+        except Exception as exc:
+            self.stderr.write(f'Задача #{pk}: {exc!r}')
+            return
+        self.stdout.write(f'Задача #{pk}: {status}')
+
+    def stop(self, signum, frame):
+        self.stopping = True
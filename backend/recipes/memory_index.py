@@ -0,0 +1,43 @@
+import time
+from threading import Lock, Thread
+
+from django.db import connections
+
+
+class PeriodicIndex:
+    """Индекс в памяти процесса, который перестраивается раз в ttl секунд.
+
+    Первая сборка идёт в запросе: отдать пока нечего. Устаревший индекс
+    продолжает отвечать, пока один фоновый поток собирает новый в
+    отдельном объекте и подменяет им данные под блокировкой, так что
+    запросы не ждут полного чтения таблицы. Подкласс задаёт ttl(),
+    _load() — свежий экземпляр со всеми данными — и _take(fresh).
+    """
+
+    def __init__(self):
+        self._built_at = None
+        self._rebuilding = False
+        self._lock = Lock()
+
+    def _ensure_built(self):
+        """Вызывается под self._lock."""
+        if self._built_at is None:
+            self._take(self._load())
+            self._built_at = time.monotonic()
+        elif (
+            not self._rebuilding
+            and time.monotonic() - self._built_at > self.ttl()
+        ):
+            self._rebuilding = True
+            Thread(target=self._rebuild, daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            fresh = self._load()
+            with self._lock:
+                self._take(fresh)
+                self._built_at = time.monotonic()
+        finally:
+            self._rebuilding = False
+            # У потока своё соединение с БД, оно больше не нужно.
+            connections.close_all()
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.1 on 2026-10-19 10:35
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX recipes_recipe_search_vector_gin '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        "UPDATE recipes_recipe SET search_vector = "
+        "setweight(to_tsvector('russian', name), 'A') || "
+        "setweight(to_tsvector('russian', text), 'B')"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS recipes_recipe_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_alter_member_email_alter_member_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        # GIN-индекс есть только в PostgreSQL, в SQLite поиск идёт
+        # по инвертированному индексу в памяти.
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-19 10:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='feed_fan_out_on_read',
+            field=models.BooleanField(default=False, help_text='Выставляется автоматически для авторов с большим числом подписчиков', verbose_name='Рецепты попадают в ленты при чтении'),
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'Записи лент',
+                'ordering': ('-pub_date', '-recipe'),
+                'indexes': [models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_entry_timeline_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.1 on 2026-10-19 10:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_feed_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favoriterecipe',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Добавлен'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending',
+            field=models.FloatField(default=0, editable=False, verbose_name='Рейтинг в трендах'),
+        ),
+        migrations.AddField(
+            model_name='shoppingrecipe',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Добавлен'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-popularity', '-pub_date'], name='recipe_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending', '-pub_date'], name='recipe_trending_idx'),
+        ),
+    ]
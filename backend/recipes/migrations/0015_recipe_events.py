@@ -0,0 +1,86 @@
+# Generated by Django 5.1.1 on 2026-10-19 10:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_popularity_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(default=0, verbose_name='Последнее событие')),
+            ],
+            options={
+                'verbose_name': 'состояние агрегации',
+                'verbose_name_plural': 'Состояние агрегации',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('view', 'Просмотр'), ('favorite', 'Добавление в избранное'), ('unfavorite', 'Удаление из избранного'), ('cart', 'Добавление в список покупок'), ('uncart', 'Удаление из списка покупок')], max_length=16, verbose_name='Действие')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+                ('recipe', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'событие',
+                'verbose_name_plural': 'События',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeStatsDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(verbose_name='Начало периода')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Просмотры')),
+                ('favorites_added', models.PositiveIntegerField(default=0, verbose_name='Добавлений в избранное')),
+                ('favorites_removed', models.PositiveIntegerField(default=0, verbose_name='Удалений из избранного')),
+                ('carts_added', models.PositiveIntegerField(default=0, verbose_name='Добавлений в список покупок')),
+                ('carts_removed', models.PositiveIntegerField(default=0, verbose_name='Удалений из списка покупок')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'статистика за день',
+                'verbose_name_plural': 'Статистика по дням',
+                'ordering': ('-start', 'recipe'),
+                'abstract': False,
+                'default_related_name': '%(class)s',
+                'indexes': [models.Index(fields=['start'], name='recipestatsdaily_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('recipe', 'start'), name='recipestatsdaily_unique_recipe_start')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeStatsHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField(verbose_name='Начало периода')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Просмотры')),
+                ('favorites_added', models.PositiveIntegerField(default=0, verbose_name='Добавлений в избранное')),
+                ('favorites_removed', models.PositiveIntegerField(default=0, verbose_name='Удалений из избранного')),
+                ('carts_added', models.PositiveIntegerField(default=0, verbose_name='Добавлений в список покупок')),
+                ('carts_removed', models.PositiveIntegerField(default=0, verbose_name='Удалений из списка покупок')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'статистика за час',
+                'verbose_name_plural': 'Статистика по часам',
+                'ordering': ('-start', 'recipe'),
+                'abstract': False,
+                'default_related_name': '%(class)s',
+                'indexes': [models.Index(fields=['start'], name='recipestatshourly_start_idx')],
+                'constraints': [models.UniqueConstraint(fields=('recipe', 'start'), name='recipestatshourly_unique_recipe_start')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('recipes', '0016_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Удалённый пользователь окончательно стирается командой purge_deleted', null=True, verbose_name='Удалён'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Удалён'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='member_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='recipe_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import migrations
+
+from recipes.partitioning import (
+    PARTITIONED_TABLES, list_partitions, rebuild_table
+)
+
+
+def partition_relations(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or not settings.RELATION_PARTITIONS:
+        return
+    for table in PARTITIONED_TABLES:
+        rebuild_table(connection, table, settings.RELATION_PARTITIONS)
+
+
+def unpartition_relations(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    for table in PARTITIONED_TABLES:
+        with connection.cursor() as cursor:
+            partitioned = list_partitions(cursor, table) is not None
+        if partitioned:
+            rebuild_table(connection, table, 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_soft_delete'),
+    ]
+
+    operations = [
+        # Секционирование включается DB_RELATION_PARTITIONS и есть только
+        # в PostgreSQL; позже число секций меняет partition_relations.
+        migrations.RunPython(partition_relations, unpartition_relations),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-19 11:42
+
+import recipes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_relation_partitions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='result_file',
+            field=models.FileField(blank=True, storage=recipes.models.job_results_storage, upload_to=recipes.models.job_result_path, verbose_name='Файл результата'),
+        ),
+    ]
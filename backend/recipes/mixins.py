@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.db.models import Count
+from django.db.models import Count, Q
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
@@ -12,9 +12,10 @@ class RecipesCountMixin:
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
         if self.annotate_field:
-            return queryset.annotate(
-                recipes_count=Count(self.annotate_field)
-            )
+            return queryset.annotate(recipes_count=Count(
+                self.annotate_field, filter=Q(**{
+                    f'{self.annotate_field}__deleted_at__isnull': True})
+            ))
         return queryset
 
     @mark_safe
@@ -27,3 +28,29 @@ class RecipesCountMixin:
             ) + f'?{self.related_field}__id__exact={obj.id}'
             return f'<a href="{url}">{count}</a>'
         return count
+
+
+class SoftDeleteAdminMixin:
+    """Удаление в админке только помечает записи.
+
+    Админка задаёт soft_delete(queryset). Страница подтверждения не
+    собирает каскад связанных объектов: его позже выполнит команда
+    purge_deleted.
+    """
+
+    def delete_model(self, request, obj):
+        self.soft_delete(self.model._base_manager.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.soft_delete(queryset)
+
+    def get_deleted_objects(self, objs, request):
+        opts = self.model._meta
+        perms_needed = (
+            set() if self.has_delete_permission(request)
+            else {opts.verbose_name}
+        )
+        return (
+            [str(obj) for obj in objs],
+            {opts.verbose_name_plural: len(objs)}, perms_needed, []
+        )
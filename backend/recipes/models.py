@@ -1,6 +1,11 @@
+import os
+import uuid
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
+from django.core.files.storage import storages
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils import timezone
@@ -29,12 +34,28 @@ class Member(AbstractUser):
         upload_to='users/images/', null=True, default=None,
         verbose_name='Аватар'
     )
+    feed_fan_out_on_read = models.BooleanField(
+        'Рецепты попадают в ленты при чтении', default=False,
+        help_text='Выставляется автоматически для авторов с большим '
+                  'числом подписчиков'
+    )
+    deleted_at = models.DateTimeField(
+        'Удалён', null=True, blank=True, editable=False,
+        help_text='Удалённый пользователь окончательно стирается командой '
+                  'purge_deleted'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
     class Meta:
         ordering = ('username',)
+        indexes = [
+            models.Index(
+                fields=['deleted_at'], name='member_deleted_idx',
+                condition=models.Q(deleted_at__isnull=False)
+            ),
+        ]
         verbose_name = 'пользователь'
         verbose_name_plural = 'Пользователи'
 
@@ -105,8 +126,20 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
+class AliveRecipeManager(models.Manager):
+    """Рецепты без помеченных удалёнными."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Recipe(models.Model):
-    """Рецепты."""
+    """Рецепты.
+
+    Удаление через API и админку только помечает рецепт (deleted_at),
+    такие рецепты скрывает менеджер по умолчанию. Каскад по продуктам,
+    избранному и спискам покупок выполняет команда purge_deleted.
+    """
 
     name = models.CharField('Название', max_length=MAX_LENGTH_RECIPE_NAME)
     text = models.TextField('Описание')
@@ -129,10 +162,36 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField(
         Ingredient, through='Product', verbose_name='Ингредиенты')
     pub_date = models.DateTimeField('Дата', default=timezone.now)
+    search_vector = SearchVectorField(
+        'Поисковый вектор', null=True, editable=False)
+    updated_at = models.DateTimeField('Изменён', auto_now=True, db_index=True)
+    popularity = models.FloatField(
+        'Популярность', default=0, editable=False)
+    trending = models.FloatField(
+        'Рейтинг в трендах', default=0, editable=False)
+    deleted_at = models.DateTimeField(
+        'Удалён', null=True, blank=True, editable=False)
+
+    objects = AliveRecipeManager()
+    all_objects = models.Manager()
 
     class Meta:
         default_related_name = '%(class)ss'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-popularity', '-pub_date'],
+                name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=['-trending', '-pub_date'], name='recipe_trending_idx'
+            ),
+            # Частичный индекс: только помеченные рецепты, для очистки.
+            models.Index(
+                fields=['deleted_at'], name='recipe_deleted_idx',
+                condition=models.Q(deleted_at__isnull=False)
+            ),
+        ]
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -157,6 +216,67 @@ class RecipeShortLink(models.Model):
         verbose_name_plural = 'Короткие ссылки'
 
 
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика, записывается при публикации рецепта"""
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата')
+
+    class Meta:
+        ordering = ('-pub_date', '-recipe')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_entry_timeline_idx'
+            )
+        ]
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Записи лент'
+
+
+class SimilarRecipe(models.Model):
+    """Предрассчитанные соседи рецепта по ингредиентам и тегам"""
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='neighbors',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField('Сходство')
+    computed_at = models.DateTimeField('Рассчитано')
+
+    class Meta:
+        ordering = ('recipe', '-score')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'], name='unique_similar_recipe')
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'], name='similar_recipe_score_idx')
+        ]
+        verbose_name = 'похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+
 class Product(models.Model):
     """Модель для связи рецепта с ингедиентом и количеством продукта"""
 
@@ -197,6 +317,7 @@ class UserRecipe(models.Model):
         Recipe, on_delete=models.CASCADE,
         verbose_name='Рецепт'
     )
+    created = models.DateTimeField('Добавлен', default=timezone.now)
 
     class Meta:
         abstract = True
@@ -227,3 +348,167 @@ class FavoriteRecipe(UserRecipe):
     class Meta(UserRecipe.Meta):
         verbose_name = 'рецепт в избранном'
         verbose_name_plural = 'Рецепты в избранном'
+
+
+class RecipeEvent(models.Model):
+    """Журнал действий с рецептами, только добавление записей"""
+
+    VIEW = 'view'
+    FAVORITE = 'favorite'
+    UNFAVORITE = 'unfavorite'
+    CART = 'cart'
+    UNCART = 'uncart'
+    KINDS = (
+        (VIEW, 'Просмотр'),
+        (FAVORITE, 'Добавление в избранное'),
+        (UNFAVORITE, 'Удаление из избранного'),
+        (CART, 'Добавление в список покупок'),
+        (UNCART, 'Удаление из списка покупок'),
+    )
+
+    # Без внешних ключей: история переживает удаление рецептов
+    # и пользователей, а пакетная вставка не ждёт проверок.
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='+', verbose_name='Рецепт'
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True,
+        related_name='+', verbose_name='Пользователь'
+    )
+    kind = models.CharField('Действие', max_length=16, choices=KINDS)
+    created = models.DateTimeField('Время', default=timezone.now)
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'событие'
+        verbose_name_plural = 'События'
+
+
+class EventRollupState(models.Model):
+    """Последнее событие, учтённое в агрегатах"""
+
+    last_event_id = models.BigIntegerField('Последнее событие', default=0)
+
+    class Meta:
+        verbose_name = 'состояние агрегации'
+        verbose_name_plural = 'Состояние агрегации'
+
+
+class RecipeStats(models.Model):
+    """Абстрактная модель агрегатов событий рецепта за период"""
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, verbose_name='Рецепт')
+    start = models.DateTimeField('Начало периода')
+    views = models.PositiveIntegerField('Просмотры', default=0)
+    favorites_added = models.PositiveIntegerField(
+        'Добавлений в избранное', default=0)
+    favorites_removed = models.PositiveIntegerField(
+        'Удалений из избранного', default=0)
+    carts_added = models.PositiveIntegerField(
+        'Добавлений в список покупок', default=0)
+    carts_removed = models.PositiveIntegerField(
+        'Удалений из списка покупок', default=0)
+
+    COUNTERS = {
+        RecipeEvent.VIEW: 'views',
+        RecipeEvent.FAVORITE: 'favorites_added',
+        RecipeEvent.UNFAVORITE: 'favorites_removed',
+        RecipeEvent.CART: 'carts_added',
+        RecipeEvent.UNCART: 'carts_removed',
+    }
+
+    class Meta:
+        abstract = True
+        default_related_name = '%(class)s'
+        ordering = ('-start', 'recipe')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'start'],
+                name='%(class)s_unique_recipe_start'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['start'], name='%(class)s_start_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} {self.start:%d.%m.%y %H:%M}'
+
+
+class RecipeStatsHourly(RecipeStats):
+    """Почасовые агрегаты событий рецепта"""
+
+    class Meta(RecipeStats.Meta):
+        verbose_name = 'статистика за час'
+        verbose_name_plural = 'Статистика по часам'
+
+
+class RecipeStatsDaily(RecipeStats):
+    """Дневные агрегаты событий рецепта"""
+
+    class Meta(RecipeStats.Meta):
+        verbose_name = 'статистика за день'
+        verbose_name_plural = 'Статистика по дням'
+
+
+def job_results_storage():
+    """Закрытое хранилище результатов задач, nginx его не отдаёт."""
+    return storages['job_results']
+
+
+def job_result_path(job, filename):
+    """Случайное имя файла: по нему не найти чужой результат."""
+    return uuid.uuid4().hex + os.path.splitext(filename)[1]
+
+
+class Job(models.Model):
+    """Задача фоновой очереди, выполняется командой run_worker"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=64)
+    payload = models.JSONField('Параметры', default=dict, blank=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='jobs', verbose_name='Пользователь'
+    )
+    status = models.CharField(
+        'Статус', max_length=16, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток', default=3)
+    # Для задачи в очереди — время следующей попытки, для выполняемой —
+    # конец таймаута видимости, после которого её заберёт другой воркер.
+    run_after = models.DateTimeField('Не раньше', default=timezone.now)
+    result = models.JSONField('Результат', null=True, blank=True)
+    result_file = models.FileField(
+        'Файл результата', storage=job_results_storage,
+        upload_to=job_result_path, blank=True
+    )
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создана', default=timezone.now)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'], name='job_status_run_after_idx'
+            )
+        ]
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
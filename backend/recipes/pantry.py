@@ -0,0 +1,105 @@
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .memory_index import PeriodicIndex
+from .models import Product
+
+
+class IngredientIndex(PeriodicIndex):
+    """Составы рецептов в памяти процесса для подбора по продуктам.
+
+    Для каждого рецепта хранится отсортированный массив id ингредиентов,
+    для каждого ингредиента — множество рецептов, где он встречается.
+    Изменения рецептов применяются точечно, а полная перестройка раз в
+    PANTRY_INDEX_TTL секунд подхватывает записи других воркеров.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._recipes = {}
+        self._postings = defaultdict(set)
+
+    def ttl(self):
+        return settings.PANTRY_INDEX_TTL
+
+    def _load(self):
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in Product.objects.filter(
+            recipe__deleted_at__isnull=True
+        ).values_list('recipe_id', 'ingredient_id').order_by(
+            'recipe_id', 'ingredient_id'
+        ).iterator(chunk_size=10000):
+            recipes[recipe_id].append(ingredient_id)
+        fresh = IngredientIndex()
+        for recipe_id, ingredient_ids in recipes.items():
+            fresh._add(recipe_id, ingredient_ids)
+        return fresh
+
+    def _take(self, fresh):
+        self._recipes, self._postings = fresh._recipes, fresh._postings
+
+    def _add(self, recipe_id, ingredient_ids):
+        if not ingredient_ids:
+            return
+        self._recipes[recipe_id] = array('q', sorted(set(ingredient_ids)))
+        for ingredient_id in self._recipes[recipe_id]:
+            self._postings[ingredient_id].add(recipe_id)
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            self._postings[ingredient_id].discard(recipe_id)
+            if not self._postings[ingredient_id]:
+                del self._postings[ingredient_id]
+
+    def refresh(self, recipe_id):
+        """Перечитывает состав одного рецепта после его изменения.
+
+        Меняет индекс только этого процесса: остальные воркеры увидят
+        новый состав после своей перестройки, не позже PANTRY_INDEX_TTL.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove(recipe_id)
+            self._add(recipe_id, list(Product.objects.filter(
+                recipe_id=recipe_id).values_list('ingredient_id', flat=True)))
+
+    def remove(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def add_ingredient(self, recipe_id, ingredient_id):
+        with self._lock:
+            ingredient_ids = list(self._recipes.get(recipe_id, ()))
+            self._remove(recipe_id)
+            self._add(recipe_id, [*ingredient_ids, ingredient_id])
+
+    def remove_ingredient(self, recipe_id, ingredient_id):
+        with self._lock:
+            ingredient_ids = list(self._recipes.get(recipe_id, ()))
+            self._remove(recipe_id)
+            self._add(recipe_id, [
+                id for id in ingredient_ids if id != ingredient_id])
+
+    def rank(self, pantry):
+        """Пары (id рецепта, покрытие) по убыванию доли имеющихся продуктов.
+
+        В выдачу попадают рецепты, для которых есть хотя бы один продукт.
+        """
+        with self._lock:
+            self._ensure_built()
+            hits = Counter()
+            for ingredient_id in set(pantry):
+                hits.update(self._postings.get(ingredient_id, ()))
+            coverage = {
+                recipe_id: count / len(self._recipes[recipe_id])
+                for recipe_id, count in hits.items()
+            }
+        return sorted(
+            coverage.items(), key=lambda item: (-item[1], -item[0])
+        )
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,157 @@
+"""Хэш-секционирование таблиц связей пользователей по user_id.
+
+Только PostgreSQL. Все запросы к избранному, спискам покупок и
+подпискам идут с user_id, поэтому читают одну секцию с небольшими
+индексами. Первичный ключ секционированной таблицы — (id, user_id):
+уникальные ограничения должны включать ключ секционирования, а
+(user, recipe) и (user, author) его уже содержат.
+"""
+import re
+
+from django.db import transaction
+
+PARTITIONED_TABLES = (
+    'recipes_favoriterecipe', 'recipes_shoppingrecipe', 'recipes_subscription'
+)
+PARTITION_KEY = 'user_id'
+
+BOUND = re.compile(r'modulus (\d+), remainder (\d+)', re.IGNORECASE)
+INDEX_TABLE = re.compile(r' ON (?:ONLY )?\S+ ')
+
+
+def partition_name(table, modulus, remainder):
+    return f'{table}_{modulus}_{remainder}'
+
+
+def list_partitions(cursor, table):
+    """[(секция, модуль, остаток)] или None для обычной таблицы."""
+    cursor.execute(
+        'SELECT relkind FROM pg_class WHERE oid = %s::regclass', [table])
+    if cursor.fetchone()[0] != 'p':
+        return None
+    cursor.execute(
+        'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) '
+        'FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+        'WHERE i.inhparent = %s::regclass ORDER BY c.relname', [table])
+    return [
+        (name, *map(int, BOUND.search(bound).groups()))
+        for name, bound in cursor.fetchall()
+    ]
+
+
+def table_ddl(cursor, table):
+    """Ограничения [(имя, тип, определение)] и прочие индексы таблицы."""
+    cursor.execute(
+        'SELECT conname, contype, pg_get_constraintdef(oid) '
+        'FROM pg_constraint WHERE conrelid = %s::regclass '
+        "AND contype IN ('p', 'u', 'f', 'c') ORDER BY contype = 'p' DESC",
+        [table])
+    constraints = cursor.fetchall()
+    cursor.execute(
+        'SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i '
+        'WHERE i.indrelid = %s::regclass AND NOT EXISTS ('
+        'SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid '
+        "AND c.conrelid = i.indrelid AND c.contype IN ('p', 'u', 'x'))",
+        [table])
+    return constraints, [definition for definition, in cursor.fetchall()]
+
+
+def create_partition(cursor, quote, table, modulus, remainder):
+    """Создаёт секцию, сразу присоединённую к таблице.
+
+    Индексы, ограничения и внешние ключи таблицы PostgreSQL создаёт на
+    секции сам.
+    """
+    cursor.execute(
+        f'CREATE TABLE {quote(partition_name(table, modulus, remainder))} '
+        f'PARTITION OF {quote(table)} FOR VALUES WITH '
+        f'(MODULUS {modulus}, REMAINDER {remainder})'
+    )
+
+
+def rebuild_table(connection, table, partitions):
+    """Пересоздаёт table с partitions секциями (0 — обычной таблицей).
+
+    Строки копируются в новую таблицу в одной транзакции, всё это
+    время таблица заблокирована: на больших таблицах это работа для
+    окна обслуживания. Для увеличения числа секций есть
+    split_partitions.
+    """
+    quote = connection.ops.quote_name
+    old = f'{table}_old'
+    sequence = f'{table}_id_seq'
+    with transaction.atomic(using=connection.alias), \
+            connection.cursor() as cursor:
+        constraints, indexes = table_ddl(cursor, table)
+        # Имена секций освобождаются для секций новой таблицы.
+        for name, modulus, remainder in list_partitions(cursor, table) or ():
+            cursor.execute(
+                f'ALTER TABLE {quote(name)} RENAME TO '
+                f'{quote(partition_name(old, modulus, remainder))}')
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(table)} (LIKE {quote(old)} '
+            'INCLUDING DEFAULTS INCLUDING STORAGE)'
+            + (f' PARTITION BY HASH ({PARTITION_KEY})' if partitions else '')
+        )
+        for remainder in range(partitions):
+            create_partition(cursor, quote, table, partitions, remainder)
+        cursor.execute(
+            f'INSERT INTO {quote(table)} SELECT * FROM {quote(old)}')
+        # Вместе со старой таблицей удаляется и её последовательность id.
+        cursor.execute(f'DROP TABLE {quote(old)} CASCADE')
+        cursor.execute(
+            f'CREATE SEQUENCE {quote(sequence)} '
+            f'OWNED BY {quote(table)}.id')
+        cursor.execute(
+            f'ALTER TABLE {quote(table)} ALTER COLUMN id '
+            f"SET DEFAULT nextval('{sequence}')")
+        cursor.execute(
+            f"SELECT setval('{sequence}', coalesce(max(id), 0) + 1, false) "
+            f'FROM {quote(table)}')
+        for name, kind, definition in constraints:
+            if kind == 'p':
+                definition = 'PRIMARY KEY ({})'.format(
+                    f'id, {PARTITION_KEY}' if partitions else 'id')
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} '
+                f'ADD CONSTRAINT {quote(name)} {definition}')
+        for definition in indexes:
+            cursor.execute(
+                INDEX_TABLE.sub(f' ON {quote(table)} ', definition, 1))
+
+
+def split_partitions(connection, table, partitions):
+    """Делит секции таблицы до partitions секций с модулем partitions.
+
+    Секция с модулем m отсоединяется, вместо неё создаются и
+    присоединяются partitions // m секций, строки переносятся в них.
+    PostgreSQL допускает секции с разными модулями, если каждый делит
+    следующий, поэтому каждая секция делится в своей транзакции.
+    DETACH PARTITION берёт ACCESS EXCLUSIVE на всю таблицу до конца
+    транзакции: пока копируются строки секции, таблица недоступна
+    целиком, между секциями запросы проходят. Как и rebuild_table, это
+    работа для окна обслуживания. Возвращает число поделённых.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        current = list_partitions(cursor, table)
+    if any(partitions % modulus for _, modulus, _ in current):
+        raise ValueError(
+            f'{partitions} секций не делится на текущие модули {table}')
+    split = 0
+    for name, modulus, remainder in current:
+        if modulus == partitions:
+            continue
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+            for new_remainder in range(remainder, partitions, modulus):
+                create_partition(
+                    cursor, quote, table, partitions, new_remainder)
+            cursor.execute(
+                f'INSERT INTO {quote(table)} SELECT * FROM {quote(name)}')
+            cursor.execute(f'DROP TABLE {quote(name)}')
+        split += 1
+    return split
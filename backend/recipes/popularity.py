@@ -0,0 +1,66 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.db import transaction
+from django.db.models import F
+
+from .constants import (
+    POPULARITY_FAVORITE_WEIGHT, POPULARITY_SHOPPING_WEIGHT,
+    TRENDING_HALF_LIFE_DAYS
+)
+from .models import FavoriteRecipe, Recipe, ShoppingRecipe
+
+
+# Вклад действия в тренды растёт вдвое каждые TRENDING_HALF_LIFE_DAYS от
+# фиксированной эпохи. Это равносильно затуханию всех старых вкладов, но
+# позволяет обновлять сумму прибавлением, без пересчёта по времени.
+# Разрядности float хватает примерно на 1000 периодов полураспада.
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+BATCH_SIZE = 5000
+
+WEIGHTS = {
+    FavoriteRecipe: POPULARITY_FAVORITE_WEIGHT,
+    ShoppingRecipe: POPULARITY_SHOPPING_WEIGHT,
+}
+
+
+def trending_weight(weight, created):
+    half_lives = (
+        (created - TRENDING_EPOCH).total_seconds()
+        / (TRENDING_HALF_LIFE_DAYS * 24 * 60 * 60)
+    )
+    return weight * 2 ** half_lives
+
+
+def apply_activity(user_recipe, sign=1):
+    """Точечно учитывает добавление (sign=1) или удаление (sign=-1)."""
+    weight = WEIGHTS[type(user_recipe)]
+    Recipe.objects.filter(pk=user_recipe.recipe_id).update(
+        popularity=F('popularity') + sign * weight,
+        trending=F('trending') + sign * trending_weight(
+            weight, user_recipe.created)
+    )
+
+
+@transaction.atomic
+def recompute_all():
+    """Пересчитывает рейтинги всех рецептов с нуля. Возвращает их число."""
+    popularity = defaultdict(float)
+    trending = defaultdict(float)
+    for model, weight in WEIGHTS.items():
+        for recipe_id, created in model.objects.values_list(
+            'recipe_id', 'created'
+        ).iterator(chunk_size=BATCH_SIZE):
+            popularity[recipe_id] += weight
+            trending[recipe_id] += trending_weight(weight, created)
+    Recipe.objects.exclude(pk__in=popularity).exclude(
+        popularity=0, trending=0).update(popularity=0, trending=0)
+    Recipe.objects.bulk_update(
+        [
+            Recipe(
+                pk=recipe_id, popularity=score, trending=trending[recipe_id]
+            ) for recipe_id, score in popularity.items()
+        ],
+        ['popularity', 'trending'], batch_size=BATCH_SIZE
+    )
+    return len(popularity)
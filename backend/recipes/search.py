@@ -0,0 +1,158 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector
+)
+from django.db import connection
+from django.db.models import Case, F, IntegerField, When
+
+from .memory_index import PeriodicIndex
+from .models import Recipe
+
+
+SEARCH_CONFIG = 'russian'
+# Веса полей совпадают с весами A и B в SearchRank PostgreSQL.
+NAME_WEIGHT = 1.0
+TEXT_WEIGHT = 0.4
+WORD_RE = re.compile(r'\w+')
+MIN_STEM_LENGTH = 3
+RUSSIAN_ENDINGS = sorted((
+    'а', 'ам', 'ами', 'ах', 'е', 'ев', 'ей', 'ем', 'и', 'ие', 'ий', 'им',
+    'ими', 'их', 'й', 'о', 'ов', 'ого', 'ое', 'ой', 'ом', 'ому', 'у', 'ую',
+    'ы', 'ые', 'ый', 'ым', 'ыми', 'ых', 'ь', 'ю', 'я', 'ям', 'ями', 'ях',
+    'ая', 'яя', 'ее', 'его', 'ему', 'ею', 'ою',
+), key=len, reverse=True)
+
+
+def recipe_search_vector():
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def stem(word):
+    """Упрощённый стеммер: отсекает самое длинное падежное окончание."""
+    for ending in RUSSIAN_ENDINGS:
+        if (
+            word.endswith(ending)
+            and len(word) - len(ending) >= MIN_STEM_LENGTH
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    return [
+        stem(word) for word in
+        WORD_RE.findall(text.lower().replace('ё', 'е'))
+    ]
+
+
+class InvertedIndex(PeriodicIndex):
+    """Инвертированный индекс рецептов в памяти для баз без tsvector.
+
+    Правки рецептов применяются точечно в своём процессе, перестройка
+    раз в SEARCH_INDEX_TTL секунд подхватывает записи других воркеров.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._postings = defaultdict(dict)
+        self._terms = {}
+
+    def ttl(self):
+        return settings.SEARCH_INDEX_TTL
+
+    def _add(self, pk, name, text):
+        weights = Counter()
+        for term in tokenize(name):
+            weights[term] += NAME_WEIGHT
+        for term in tokenize(text):
+            weights[term] += TEXT_WEIGHT
+        self._terms[pk] = tuple(weights)
+        for term, weight in weights.items():
+            self._postings[term][pk] = weight
+
+    def _remove(self, pk):
+        for term in self._terms.pop(pk, ()):
+            self._postings[term].pop(pk, None)
+            if not self._postings[term]:
+                del self._postings[term]
+
+    def _load(self):
+        fresh = InvertedIndex()
+        for pk, name, text in Recipe.objects.values_list(
+            'pk', 'name', 'text'
+        ).iterator():
+            fresh._add(pk, name, text)
+        return fresh
+
+    def _take(self, fresh):
+        self._postings, self._terms = fresh._postings, fresh._terms
+
+    def update(self, pk, name, text):
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(pk)
+                self._add(pk, name, text)
+
+    def remove(self, pk):
+        with self._lock:
+            if self._built_at is not None:
+                self._remove(pk)
+
+    def search(self, query):
+        """Id рецептов, содержащих все слова запроса, по убыванию tf-idf."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            self._ensure_built()
+            postings = [self._postings.get(term, {}) for term in terms]
+            total = len(self._terms)
+        postings.sort(key=len)
+        matches = set(postings[0]).intersection(*postings[1:])
+        scores = {
+            pk: sum(
+                posting[pk] * math.log(1 + total / len(posting))
+                for posting in postings
+            )
+            for pk in matches
+        }
+        return sorted(scores, key=scores.get, reverse=True)
+
+
+index = InvertedIndex()
+
+
+def uses_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_index(recipe):
+    if uses_search_vector():
+        Recipe.objects.filter(pk=recipe.pk).update(
+            search_vector=recipe_search_vector())
+    else:
+        index.update(recipe.pk, recipe.name, recipe.text)
+
+
+def search_recipes(recipes, query):
+    """Отфильтровывает рецепты по запросу и сортирует по релевантности."""
+    if uses_search_vector():
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch')
+        return recipes.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', *Recipe._meta.ordering)
+    ids = index.search(query)
+    if not ids:
+        return recipes.none()
+    return recipes.filter(pk__in=ids).order_by(Case(
+        *(When(pk=pk, then=position) for position, pk in enumerate(ids)),
+        output_field=IntegerField()
+    ))
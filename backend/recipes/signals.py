@@ -0,0 +1,98 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .deletion import recipes_soft_deleted
+from .events import record_event
+from .feed import backfill, remove_author, remove_recipes
+from .jobs import enqueue
+from .models import (
+    FavoriteRecipe, Product, Recipe, RecipeEvent, ShoppingRecipe,
+    Subscription
+)
+from .pantry import ingredient_index
+from .popularity import apply_activity
+from .search import index, update_search_index
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_index(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        update_search_index(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_indexes(sender, instance, **kwargs):
+    index.remove(instance.pk)
+    ingredient_index.remove(instance.pk)
+
+
+@receiver(recipes_soft_deleted, sender=Recipe)
+def remove_deleted_recipes_from_indexes(sender, recipe_ids, **kwargs):
+    for recipe_id in recipe_ids:
+        index.remove(recipe_id)
+        ingredient_index.remove(recipe_id)
+
+
+@receiver(recipes_soft_deleted, sender=Recipe)
+def remove_deleted_recipes_from_feeds(sender, recipe_ids, **kwargs):
+    remove_recipes(recipe_ids)
+
+
+@receiver(post_save, sender=Product)
+def add_recipe_ingredient(sender, instance, created, **kwargs):
+    if created:
+        ingredient_index.add_ingredient(
+            instance.recipe_id, instance.ingredient_id)
+    else:
+        ingredient_index.refresh(instance.recipe_id)
+
+
+@receiver(post_delete, sender=Product)
+def remove_recipe_ingredient(sender, instance, **kwargs):
+    ingredient_index.remove_ingredient(
+        instance.recipe_id, instance.ingredient_id)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        # Рассылка идёт в воркере после фиксации: к этому времени
+        # продукты и теги рецепта записаны, а запрос не ждёт подписчиков.
+        recipe_id = instance.pk
+        transaction.on_commit(
+            lambda: enqueue('fan_out_recipe', recipe_id=recipe_id))
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_feed(sender, instance, **kwargs):
+    remove_author(instance.user, instance.author)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingRecipe)
+def add_recipe_activity(sender, instance, created, **kwargs):
+    if created:
+        apply_activity(instance)
+        record_event(
+            RecipeEvent.FAVORITE if sender is FavoriteRecipe else
+            RecipeEvent.CART,
+            instance.recipe_id, instance.user
+        )
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingRecipe)
+def remove_recipe_activity(sender, instance, **kwargs):
+    apply_activity(instance, sign=-1)
+    record_event(
+        RecipeEvent.UNFAVORITE if sender is FavoriteRecipe else
+        RecipeEvent.UNCART,
+        instance.recipe_id, instance.user
+    )
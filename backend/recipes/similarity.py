@@ -0,0 +1,140 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .constants import SIMILAR_RECIPES_TOP_K, TAG_SIMILARITY_WEIGHT
+from .models import Product, Recipe, SimilarRecipe
+
+
+BATCH_SIZE = 5000
+
+
+class RecipeFeatures:
+    """Разреженные матрицы рецепт-ингредиент и рецепт-тег в виде множеств.
+
+    Строка матрицы — множество id ингредиентов (тегов) рецепта, столбец —
+    множество рецептов с ингредиентом. Кандидаты в соседи находятся
+    произведением строки на столбцы, то есть только среди рецептов
+    с общими ингредиентами.
+    """
+
+    def __init__(self):
+        self.ingredients = defaultdict(set)
+        self.tags = defaultdict(set)
+        self.postings = defaultdict(set)
+        for recipe_id, ingredient_id in Product.objects.filter(
+            recipe__deleted_at__isnull=True
+        ).values_list('recipe_id', 'ingredient_id').iterator(
+            chunk_size=BATCH_SIZE
+        ):
+            self.ingredients[recipe_id].add(ingredient_id)
+            self.postings[ingredient_id].add(recipe_id)
+        for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag_id'
+        ).iterator(chunk_size=BATCH_SIZE):
+            self.tags[recipe_id].add(tag_id)
+
+    def score(self, recipe_id, other_id, shared_ingredients):
+        """Взвешенный коэффициент Жаккара по ингредиентам и тегам."""
+        tags, other_tags = self.tags[recipe_id], self.tags[other_id]
+        shared_tags = len(tags & other_tags)
+        union = (
+            len(self.ingredients[recipe_id])
+            + len(self.ingredients[other_id]) - shared_ingredients
+            + TAG_SIMILARITY_WEIGHT * (
+                len(tags) + len(other_tags) - shared_tags)
+        )
+        return (
+            shared_ingredients + TAG_SIMILARITY_WEIGHT * shared_tags
+        ) / union
+
+    def candidates(self, recipe_id):
+        """Число общих ингредиентов с каждым рецептом-кандидатом."""
+        shared = Counter()
+        for ingredient_id in self.ingredients.get(recipe_id, ()):
+            shared.update(self.postings[ingredient_id])
+        shared.pop(recipe_id, None)
+        return shared
+
+    def scores(self, recipe_id):
+        return {
+            other_id: self.score(recipe_id, other_id, count)
+            for other_id, count in self.candidates(recipe_id).items()
+        }
+
+
+def top(scores, top_k):
+    return dict(heapq.nlargest(top_k, scores.items(), key=lambda x: x[1]))
+
+
+def save_neighbors(neighbors, computed_at):
+    SimilarRecipe.objects.filter(recipe__in=neighbors).delete()
+    SimilarRecipe.objects.bulk_create((
+        SimilarRecipe(
+            recipe_id=recipe_id, similar_id=similar_id, score=score,
+            computed_at=computed_at
+        )
+        for recipe_id, row in neighbors.items()
+        for similar_id, score in row.items()
+    ), batch_size=BATCH_SIZE)
+
+
+def last_computed_at():
+    return SimilarRecipe.objects.order_by(
+        '-computed_at').values_list('computed_at', flat=True).first()
+
+
+@transaction.atomic
+def compute_all(top_k=SIMILAR_RECIPES_TOP_K):
+    """Полный пересчёт таблицы соседей. Возвращает число рецептов."""
+    computed_at = timezone.now()
+    features = RecipeFeatures()
+    neighbors = {
+        recipe_id: top(features.scores(recipe_id), top_k)
+        for recipe_id in features.ingredients
+    }
+    SimilarRecipe.objects.all().delete()
+    save_neighbors(neighbors, computed_at)
+    return len(neighbors)
+
+
+@transaction.atomic
+def compute_touched(since, top_k=SIMILAR_RECIPES_TOP_K):
+    """Пересчёт для рецептов, изменённых после since.
+
+    Строки изменённых рецептов считаются заново; в строки их соседей
+    вливаются новые оценки пар. Рецепт, вытесненный из чужой строки,
+    вернётся туда при следующем полном пересчёте.
+    """
+    computed_at = timezone.now()
+    touched = set(Recipe.objects.filter(
+        updated_at__gte=since).values_list('pk', flat=True))
+    if not touched:
+        return 0
+    features = RecipeFeatures()
+    neighbors = {}
+    new_scores = defaultdict(dict)
+    for recipe_id in touched:
+        scores = features.scores(recipe_id)
+        neighbors[recipe_id] = top(scores, top_k)
+        for other_id, score in scores.items():
+            if other_id not in touched:
+                new_scores[other_id][recipe_id] = score
+    affected = set(new_scores) | set(SimilarRecipe.objects.filter(
+        similar__in=touched).exclude(recipe__in=touched).values_list(
+        'recipe_id', flat=True))
+    rows = defaultdict(dict)
+    for recipe_id, similar_id, score in SimilarRecipe.objects.filter(
+        recipe__in=affected
+    ).values_list('recipe_id', 'similar_id', 'score').iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        if similar_id not in touched:
+            rows[recipe_id][similar_id] = score
+    for recipe_id in affected:
+        neighbors[recipe_id] = top(
+            {**rows[recipe_id], **new_scores[recipe_id]}, top_k)
+    save_neighbors(neighbors, computed_at)
+    return len(touched)
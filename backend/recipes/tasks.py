@@ -0,0 +1,55 @@
+import csv
+
+from .deletion import purge_deleted as purge
+from .feed import fan_out
+from .jobs import purge_jobs as purge_finished_jobs
+from .jobs import task
+from .models import Ingredient, Recipe
+from .popularity import recompute_all
+
+
+@task()
+def load_csv(job, csv_file):
+    """Добавляет ингредиенты из CSV, уже загруженные пропускает."""
+    existing = set(
+        Ingredient.objects.values_list('name', 'measurement_unit'))
+    with open(csv_file, newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader)
+        ingredients = {
+            (name, measurement_unit) for name, measurement_unit in reader
+        } - existing
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit=measurement_unit)
+        for name, measurement_unit in ingredients
+    )
+    return {'created': len(ingredients)}
+
+
+@task()
+def recompute_popularity(job):
+    """Пересчёт рейтингов, сверяющий счётчики с избранным и покупками."""
+    return {'recipes': recompute_all()}
+
+
+@task()
+def purge_deleted(job, batch_size=None):
+    """Стирает помеченные рецепты и пользователей, см. deletion."""
+    return purge(batch_size)
+
+
+@task()
+def purge_jobs(job, ttl=None):
+    """Удаляет старые задачи и файлы результатов, см. jobs.purge_jobs."""
+    return purge_finished_jobs(ttl)
+
+
+@task()
+def fan_out_recipe(job, recipe_id):
+    """Раскладывает новый рецепт по лентам подписчиков, см. feed."""
+    recipe = Recipe.objects.select_related('author').filter(
+        pk=recipe_id).first()
+    # Рецепт могли удалить, пока задача ждала воркера.
+    if recipe is not None:
+        fan_out(recipe)
+    return {'delivered': recipe is not None}
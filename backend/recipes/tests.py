@@ -0,0 +1,243 @@
+import os
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .deletion import purge_deleted, soft_delete_recipes, soft_delete_user
+from .jobs import RETRY_DELAY, claim, enqueue, purge_jobs, run_job, task
+from .feed import read_feed
+from .models import (
+    FavoriteRecipe, FeedEntry, Ingredient, Job, Product, Recipe, User
+)
+from .units import aggregate_amounts, humanize, normalize_unit
+
+
+class UnitsTests(SimpleTestCase):
+    """Приведение единиц и сведение количеств в списке покупок."""
+
+    def test_normalize_spellings(self):
+        self.assertEqual(normalize_unit('Гр'), 'г')
+        self.assertEqual(normalize_unit('ст.л'), 'ст. л.')
+        self.assertEqual(normalize_unit('Чайная ложка'), 'ч. л.')
+        self.assertEqual(normalize_unit(' по вкусу '), 'по вкусу')
+
+    def test_humanize(self):
+        self.assertEqual(humanize('г', 1500), ('кг', '1,5'))
+        self.assertEqual(humanize('г', 250), ('г', '250'))
+        self.assertEqual(humanize('мл', 1000), ('л', '1'))
+
+    def test_merges_mass_units(self):
+        self.assertEqual(
+            aggregate_amounts([('Мука', 'г', 500), ('мука', 'кг', 1)]),
+            [('Мука', 'кг', '1,5')]
+        )
+
+    def test_merges_spoons_into_millilitres(self):
+        self.assertEqual(
+            aggregate_amounts(
+                [('Молоко', 'мл', 100), ('Молоко', 'ст. л.', 2)]),
+            [('Молоко', 'мл', '130')]
+        )
+
+    def test_keeps_single_non_metric_unit(self):
+        self.assertEqual(
+            aggregate_amounts([('Соль', 'ч. л.', 1), ('Соль', 'ч.л.', 2)]),
+            [('Соль', 'ч. л.', '3')]
+        )
+
+    def test_does_not_mix_mass_and_volume(self):
+        self.assertEqual(
+            aggregate_amounts([('Сахар', 'г', 100), ('Сахар', 'стакан', 1)]),
+            [('Сахар', 'г', '100'), ('Сахар', 'стакан', '1')]
+        )
+
+
+class SoftDeleteTests(TestCase):
+    """Помеченные рецепты скрыты, purge_deleted стирает их с зависимыми."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            'author', 'author@example.com', 'password',
+            first_name='Автор', last_name='Рецептов'
+        )
+        cls.reader = User.objects.create_user(
+            'reader', 'reader@example.com', 'password',
+            first_name='Читатель', last_name='Рецептов'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='мука', measurement_unit='г')
+        cls.recipes = [
+            Recipe.objects.create(
+                name=f'Рецепт {number}', text='Описание', cooking_time=10,
+                image='recipes/images/recipe.png', author=cls.author
+            ) for number in range(2)
+        ]
+        for recipe in cls.recipes:
+            Product.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=100)
+            FavoriteRecipe.objects.create(user=cls.reader, recipe=recipe)
+
+    def test_soft_deleted_recipe_is_hidden(self):
+        recipe = self.recipes[0]
+        soft_delete_recipes(Recipe.objects.filter(pk=recipe.pk))
+        self.assertFalse(Recipe.objects.filter(pk=recipe.pk).exists())
+        self.assertTrue(Recipe.all_objects.filter(pk=recipe.pk).exists())
+        self.assertEqual(
+            self.client.get(f'/api/recipes/{recipe.pk}/').status_code, 404)
+        self.assertEqual(
+            self.client.get(
+                f'/api/recipes/{self.recipes[1].pk}/').status_code, 200)
+
+    def test_soft_deleted_recipe_leaves_feeds(self):
+        FeedEntry.objects.bulk_create(
+            FeedEntry(
+                user=self.reader, recipe=recipe, author=self.author,
+                pub_date=recipe.pub_date
+            ) for recipe in self.recipes
+        )
+        soft_delete_recipes(Recipe.objects.filter(pk=self.recipes[0].pk))
+        self.assertEqual(
+            [pk for _, pk in read_feed(self.reader, None, 10)],
+            [self.recipes[1].pk]
+        )
+
+    def test_soft_deleted_user_is_disabled(self):
+        soft_delete_user(self.author)
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.assertIsNotNone(self.author.deleted_at)
+        self.assertFalse(Recipe.objects.filter(author=self.author).exists())
+
+    def test_purge_deletes_recipes_and_dependents(self):
+        soft_delete_recipes(Recipe.objects.filter(pk=self.recipes[0].pk))
+        self.assertEqual(
+            purge_deleted(batch_size=1), {'recipes': 1, 'users': 0})
+        self.assertFalse(
+            Recipe.all_objects.filter(pk=self.recipes[0].pk).exists())
+        for model in (Product, FavoriteRecipe):
+            self.assertEqual(
+                list(model.objects.values_list('recipe', flat=True)),
+                [self.recipes[1].pk]
+            )
+
+    def test_purge_deletes_user_after_recipes(self):
+        soft_delete_user(self.author)
+        self.assertEqual(
+            purge_deleted(batch_size=1), {'recipes': 2, 'users': 1})
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Product.objects.exists())
+        self.assertTrue(User.objects.filter(pk=self.reader.pk).exists())
+
+
+@task(name='test_flaky', max_attempts=2)
+def flaky(job, fail):
+    if fail:
+        raise ValueError('сбой задачи')
+    return {'attempt': job.attempts}
+
+
+class JobQueueTests(TransactionTestCase):
+    """Таймаут видимости и повторы задач очереди.
+
+    run_job закрывает соединение с БД, поэтому задачи выполняются вне
+    транзакции теста.
+    """
+
+    def expire(self, job):
+        Job.objects.filter(pk=job.pk).update(
+            run_after=timezone.now() - timedelta(seconds=1))
+
+    def test_claimed_job_is_hidden_until_timeout(self):
+        job = enqueue('test_flaky', fail=False)
+        self.assertEqual(claim(10), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.RUNNING, 1))
+        self.assertEqual(claim(10), [])
+        self.expire(job)
+        self.assertEqual(claim(10), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+    def test_last_attempt_timeout_fails_job(self):
+        job = enqueue('test_flaky', fail=False)
+        for _ in range(job.max_attempts):
+            claim(10)
+            self.expire(job)
+        self.assertEqual(claim(10), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.error, 'Превышен таймаут видимости')
+
+    def test_successful_job(self):
+        job = enqueue('test_flaky', fail=False)
+        claim(10)
+        self.assertEqual(run_job(job.pk), Job.DONE)
+        job.refresh_from_db()
+        self.assertEqual(job.result, {'attempt': 1})
+        self.assertIsNotNone(job.finished)
+
+    def test_failed_job_is_retried_with_delay(self):
+        job = enqueue('test_flaky', fail=True)
+        claim(10)
+        started = timezone.now()
+        with self.assertLogs('recipes.jobs', 'ERROR'):
+            self.assertEqual(run_job(job.pk), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertIn('сбой задачи', job.error)
+        self.assertGreaterEqual(job.run_after, started + RETRY_DELAY)
+        self.assertEqual(claim(10), [])
+        self.expire(job)
+        self.assertEqual(claim(10), [job.pk])
+        with self.assertLogs('recipes.jobs', 'ERROR'):
+            self.assertEqual(run_job(job.pk), Job.FAILED)
+
+
+class JobResultsTests(TestCase):
+    """Файлы результатов: закрытое хранилище и очистка старых."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = FileSystemStorage(location=directory.name)
+        patcher = mock.patch.object(
+            Job._meta.get_field('result_file'), 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def finished_job(self, age):
+        job = Job.objects.create(
+            name='shopping_list', status=Job.DONE,
+            finished=timezone.now() - timedelta(seconds=age)
+        )
+        job.result_file.save('shopping_list.txt', ContentFile(b'1'))
+        return job
+
+    def age_file(self, name, age):
+        path = self.storage.path(name)
+        os.utime(path, (time.time() - age, time.time() - age))
+
+    def test_result_names_are_random(self):
+        names = {self.finished_job(0).result_file.name for _ in range(2)}
+        self.assertEqual(len(names), 2)
+        for name in names:
+            self.assertRegex(name, r'^[0-9a-f]{32}\.txt$')
+
+    def test_purge_removes_old_jobs_and_files(self):
+        old, fresh = self.finished_job(200), self.finished_job(0)
+        self.age_file(old.result_file.name, 200)
+        orphan = self.storage.save('orphan.txt', ContentFile(b'1'))
+        self.age_file(orphan, 200)
+        running = self.storage.save('running.txt', ContentFile(b'1'))
+        self.assertEqual(purge_jobs(100), {'jobs': 1, 'files': 2})
+        self.assertEqual(list(Job.objects.all()), [fresh])
+        self.assertEqual(
+            sorted(self.storage.listdir('')[1]),
+            sorted([fresh.result_file.name, running])
+        )
@@ -0,0 +1,99 @@
+import re
+from functools import lru_cache
+
+# Единица измерения -> (базовая единица, множитель). Количества в единицах
+# с общей базовой складываются; без плотности масса и объём не смешиваются.
+UNITS = {
+    'мг': ('г', 0.001),
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'капля': ('мл', 0.05),
+    'ч. л.': ('мл', 5),
+    'дес. л.': ('мл', 10),
+    'ст. л.': ('мл', 15),
+    'стакан': ('мл', 250),
+    'шт.': ('шт.', 1),
+    # Штучные единицы из data/ingredients.csv, каждая сама себе база.
+    'банка': ('банка', 1),
+    'батон': ('батон', 1),
+    'веточка': ('веточка', 1),
+    'горсть': ('горсть', 1),
+    'кусок': ('кусок', 1),
+    'щепотка': ('щепотка', 1),
+}
+# Единицы, в которых количество всегда показывается в базовой или крупной
+# единице. Остальные (ложки, штуки) сохраняются, если продукт только в них.
+METRIC_UNITS = {'мг', 'г', 'кг', 'мл', 'л'}
+# Базовая единица -> крупная единица, в которой показывается количество
+# от её множителя и больше.
+LARGER_UNITS = {'г': ('кг', 1000), 'мл': ('л', 1000)}
+
+
+def compact(unit):
+    return re.sub(r'\s+', '', unit.lower()).rstrip('.')
+
+
+# Написания без пробелов, регистра и точки в конце -> ключи UNITS.
+SPELLINGS = {
+    **{compact(unit): unit for unit in UNITS},
+    'гр': 'г', 'грамм': 'г', 'килограмм': 'кг', 'литр': 'л', 'штука': 'шт.',
+    'чайнаяложка': 'ч. л.', 'столоваяложка': 'ст. л.',
+}
+
+
+def normalize_unit(unit):
+    """Известная единица в написании UNITS, неизвестная как есть."""
+    return SPELLINGS.get(compact(unit), unit.strip())
+
+
+@lru_cache(maxsize=None)
+def conversion(unit):
+    """(единица в написании UNITS, базовая единица, множитель)."""
+    unit = normalize_unit(unit)
+    return (unit, *UNITS.get(unit, (unit, 1)))
+
+
+def humanize(unit, amount):
+    """Количество в базовой единице -> (единица, строка) для чтения."""
+    if unit in LARGER_UNITS:
+        larger, factor = LARGER_UNITS[unit]
+        if amount >= factor:
+            unit, amount = larger, amount / factor
+    amount = round(amount, 2)
+    if amount == int(amount):
+        return unit, str(int(amount))
+    return unit, f'{amount:.2f}'.rstrip('0').replace('.', ',')
+
+
+def aggregate_amounts(rows):
+    """Сводит суммы по ингредиентам в строки списка покупок.
+
+    rows — тройки (название, единица, сумма количества) по ингредиентам.
+    Один продукт в разных единицах одной величины (г и кг, мл и ст. л.)
+    складывается в одну строку за один проход. Если продукт встречается
+    только в одной немерной единице (ч. л., шт.), она сохраняется.
+    Возвращает отсортированные по названию тройки (название, единица,
+    количество строкой).
+    """
+    lines = {}
+    for name, unit, amount in rows:
+        unit, base, factor = conversion(unit)
+        key = (name.lower(), base)
+        line = lines.get(key)
+        if line is None:
+            lines[key] = [name, unit, amount * factor]
+            continue
+        if line[1] != unit:
+            line[1] = base
+        line[2] += amount * factor
+    products = []
+    for name, unit, amount in lines.values():
+        unit, base, factor = conversion(unit)
+        if unit in METRIC_UNITS:
+            unit = base
+        else:
+            amount /= factor
+        products.append((name, *humanize(unit, amount)))
+    return sorted(products, key=lambda line: (line[0].lower(), line[1]))
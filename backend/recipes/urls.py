@@ -1,10 +1,15 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import redirect_to_recipe
+from .views import aredirect_to_recipe, redirect_to_recipe
 
 
 app_name = 'recipes'
 
 urlpatterns = [
-    path('<str:short_code>/', redirect_to_recipe, name='short-link-redirect'),
+    path(
+        '<str:short_code>/',
+        aredirect_to_recipe if settings.ASGI_ENABLED else redirect_to_recipe,
+        name='short-link-redirect'
+    ),
 ]
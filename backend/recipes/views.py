@@ -1,14 +1,44 @@
-from django.shortcuts import get_object_or_404, redirect
+from django.conf import settings
+from django.http import Http404
+from django.shortcuts import redirect
 from django.urls import reverse
 
+from api.coalescing import aget_or_build, get_or_build
 from .models import RecipeShortLink
 
+SHORT_LINK_KEY = 'recipes:short-link:{}'
+
+
+def recipe_id_query(short_code):
+    return RecipeShortLink.objects.filter(
+        short_code=short_code, recipe__deleted_at__isnull=True
+    ).values_list('recipe_id', flat=True)
+
+
+def recipe_redirect(request, recipe_id):
+    if recipe_id is None:
+        raise Http404('No RecipeShortLink matches the given query.')
+    frontend_url = reverse('frontend-recipe-detail', args=[recipe_id])
+    return redirect(request.build_absolute_uri(frontend_url))
+
 
 def redirect_to_recipe(request, short_code):
-    """Перенаправление по короткой ссылке на страницу рецепта"""
-    short_link = get_object_or_404(RecipeShortLink, short_code=short_code)
-    frontend_url = reverse(
-        'frontend-recipe-detail', args=[short_link.recipe.pk]
-    )
-    full_url = request.build_absolute_uri(frontend_url)
-    return redirect(full_url)
+    """Перенаправление по короткой ссылке на страницу рецепта.
+
+    Код ссылки не меняется, поэтому id рецепта берётся из кэша, а
+    одновременные переходы по новой ссылке читают БД один раз.
+    """
+    return recipe_redirect(request, get_or_build(
+        SHORT_LINK_KEY.format(short_code),
+        recipe_id_query(short_code).first,
+        settings.SHORT_LINK_CACHE_TTL
+    ))
+
+
+async def aredirect_to_recipe(request, short_code):
+    """Асинхронный вариант redirect_to_recipe для ASGI-развёртывания"""
+    return recipe_redirect(request, await aget_or_build(
+        SHORT_LINK_KEY.format(short_code),
+        recipe_id_query(short_code).afirst,
+        settings.SHORT_LINK_CACHE_TTL
+    ))